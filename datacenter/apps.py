@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class DatacenterConfig(AppConfig):
 	name = 'datacenter'
+
+	def ready(self):
+		from datacenter import signals  # noqa: F401
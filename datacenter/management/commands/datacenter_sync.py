@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from datacenter import sync
+from datacenter.models import DatacenterAuth
+
+
+class Command(BaseCommand):
+	help = "Fetch datacenters, clusters and features from every provider endpoint concurrently and store them"
+
+	def add_arguments(self, parser):
+		parser.add_argument("hostnames", nargs="*", help="Endpoints to sync; all of them when omitted")
+
+	def handle(self, *args, **options):
+		auths = DatacenterAuth.objects.all()
+		if options["hostnames"]:
+			auths = auths.filter(hostname__in=options["hostnames"])
+			if len(auths) != len(set(options["hostnames"])):
+				raise CommandError("Unknown hostname")
+		failed = 0
+		for result in sync.sync(auths):
+			if result.error:
+				failed += 1
+				self.stderr.write(f"{result.auth}: {result.error}")
+			else:
+				self.stdout.write(f"{result.auth}: {result.created} created, {result.updated} updated, "
+				                  f"{result.unchanged} unchanged, {result.deleted} deleted")
+		if failed:
+			raise CommandError(f"{failed} endpoints failed")
@@ -40,6 +40,9 @@ class DatacenterAuth(models.Model):
 
 class Cluster(models.Model):
 	name = models.CharField(max_length=64, verbose_name=_("name"))
+	external_id = models.CharField(max_length=64, blank=True, editable=False, verbose_name=_("external id"))
+	authentication = models.ForeignKey(to=DatacenterAuth, verbose_name=_("authentication"), on_delete=models.SET_NULL,
+	                                   null=True)
 
 	class Meta:
 		verbose_name = _("cluster")
@@ -56,6 +59,7 @@ class Datacenter(models.Model):
 	cluster = models.ManyToManyField(to=Cluster, verbose_name=_("cluster"))
 	authentication = models.ForeignKey(to=DatacenterAuth, verbose_name=_("authentication"), on_delete=models.SET_NULL,
 	                                   null=True)
+	sync_hash = models.CharField(max_length=40, blank=True, editable=False, verbose_name=_("sync hash"))
 
 	class Meta:
 		verbose_name = _("datacenter")
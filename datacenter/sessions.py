@@ -0,0 +1,166 @@
+import http.client
+import threading
+import time
+
+from django.conf import settings
+from prometheus_client import Counter
+
+from datacenter.models import DatacenterAuth
+from datacenter.vmware import AuthenticationExpired, ProviderError, VSphereEndpoint
+
+ENDPOINTS = {
+	DatacenterAuth.VMWARE: VSphereEndpoint,
+}
+
+POOL_HITS = Counter("datacenter_session_pool_hits_total", "Provider sessions, tokens and connections reused",
+                    ["kind"])
+POOL_MISSES = Counter("datacenter_session_pool_misses_total",
+                      "Provider sessions, tokens and connections created because none could be reused", ["kind"])
+POOL_EVICTIONS = Counter("datacenter_session_pool_evictions_total", "Provider sessions dropped from the pool",
+                         ["reason"])
+
+
+def fingerprint(auth):
+	return auth.provider, auth.hostname, auth.username, auth.password, auth.secure_ssl
+
+
+class Session:
+	"""
+	Auth token and idle keep-alive connections of one DatacenterAuth, shared by the threads using it.
+	"""
+
+	def __init__(self, auth):
+		self.fingerprint = fingerprint(auth)
+		self.endpoint = ENDPOINTS[auth.provider](auth)
+		self.lock = threading.Lock()
+		self.login_lock = threading.Lock()
+		self.token = None
+		self.token_time = 0
+		self.idle = []
+		self.last_used = time.monotonic()
+
+	def connection(self):
+		with self.lock:
+			self.last_used = time.monotonic()
+			if self.idle:
+				POOL_HITS.labels("connection").inc()
+				return self.idle.pop(), True
+		POOL_MISSES.labels("connection").inc()
+		return self.endpoint.connect(), False
+
+	def release(self, connection):
+		with self.lock:
+			self.idle.append(connection)
+
+	def get_token(self, stale=None):
+		"""
+		Return the session token, logging in when there is none, it has aged out, or it is the `stale` one.
+		"""
+		# Serialize logins so threads finding no valid token wait for one login instead of each starting one
+		with self.login_lock:
+			with self.lock:
+				expired = time.monotonic() - self.token_time > settings.DATACENTER_SESSION_TOKEN_TTL
+				if self.token is not None and self.token != stale and not expired:
+					POOL_HITS.labels("token").inc()
+					return self.token
+			token = self.call(self.endpoint.authenticate)
+			POOL_MISSES.labels("token").inc()
+			with self.lock:
+				self.token, self.token_time = token, time.monotonic()
+			return token
+
+	def request(self, method, path):
+		"""
+		Send an authenticated request, logging in again once if the token was rejected.
+		"""
+		token = self.get_token()
+		try:
+			return self.send(method, path, token)
+		except AuthenticationExpired:
+			return self.send(method, path, self.get_token(stale=token))
+
+	def send(self, method, path, token):
+		headers = self.endpoint.headers(token)
+		return self.call(lambda connection: self.endpoint.send(connection, method, path, headers))
+
+	def call(self, operation):
+		"""
+		Run operation(connection) on a pooled connection, returning the connection to the pool afterwards.
+		"""
+		connection, reused = self.connection()
+		try:
+			try:
+				value = operation(connection)
+			except (OSError, http.client.HTTPException):
+				if not reused:
+					raise
+				# The server may have closed an idle keep-alive connection; retry once on a new one
+				connection.close()
+				connection = self.endpoint.connect()
+				value = operation(connection)
+		except ProviderError:
+			# The error response was read in full, so the connection stays usable
+			self.release(connection)
+			raise
+		except BaseException:
+			connection.close()
+			raise
+		self.release(connection)
+		return value
+
+	def close(self):
+		with self.lock:
+			idle, self.idle = self.idle, []
+		for connection in idle:
+			connection.close()
+
+
+class SessionPool:
+	"""
+	Provider sessions keyed by DatacenterAuth id, evicted after DATACENTER_SESSION_IDLE_TIMEOUT seconds unused.
+	"""
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.sessions = {}
+
+	def get(self, auth):
+		self.evict_idle()
+		with self.lock:
+			session = self.sessions.get(auth.pk)
+			if session is not None and session.fingerprint == fingerprint(auth):
+				POOL_HITS.labels("session").inc()
+				return session
+			# Credentials edited in another process never reach the signal receivers here
+			stale = session
+			session = self.sessions[auth.pk] = Session(auth)
+		if stale is not None:
+			POOL_EVICTIONS.labels("changed").inc()
+			stale.close()
+		POOL_MISSES.labels("session").inc()
+		return session
+
+	def invalidate(self, auth_id):
+		with self.lock:
+			session = self.sessions.pop(auth_id, None)
+		if session is not None:
+			POOL_EVICTIONS.labels("changed").inc()
+			session.close()
+
+	def evict_idle(self):
+		cutoff = time.monotonic() - settings.DATACENTER_SESSION_IDLE_TIMEOUT
+		with self.lock:
+			idle = [key for key, session in self.sessions.items() if session.last_used < cutoff]
+			evicted = [self.sessions.pop(key) for key in idle]
+		for session in evicted:
+			POOL_EVICTIONS.labels("idle").inc()
+			session.close()
+
+	def clear(self):
+		with self.lock:
+			sessions, self.sessions = list(self.sessions.values()), {}
+		for session in sessions:
+			session.close()
+
+
+session_pool = SessionPool()
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from datacenter.models import DatacenterAuth
+from datacenter.sessions import session_pool
+
+
+@receiver(post_save, sender=DatacenterAuth)
+@receiver(post_delete, sender=DatacenterAuth)
+def auth_changed(sender, instance, **kwargs):
+	pk = instance.pk
+	transaction.on_commit(lambda: session_pool.invalidate(pk))
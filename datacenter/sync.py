@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import http.client
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from slugify import slugify
+
+from datacenter.models import Cluster, Datacenter, DatacenterAuth, Features
+from datacenter.sessions import session_pool
+from datacenter.vmware import FEATURE_FLAGS, ProviderError, VSphereClient
+
+SyncResult = namedtuple("SyncResult", ["auth", "created", "updated", "unchanged", "deleted", "error"])
+
+PROVIDERS = {
+	DatacenterAuth.VMWARE: VSphereClient,
+}
+
+
+def host(auth):
+	"""
+	Return the host and port of an endpoint, which may be stored with a scheme.
+	"""
+	return urlsplit(auth.hostname if "://" in auth.hostname else f"//{auth.hostname}").netloc.lower()
+
+
+async def fetch(auth, semaphore, executor):
+	"""
+	Return the datacenters of one endpoint as [{"name", "clusters": [{"id", "name", "features"}]}].
+
+	The blocking client runs in the executor over a pooled session, so tokens and keep-alive connections carry
+	over between syncs; the per-host semaphore bounds how many requests are in flight, and the cluster listings
+	of every datacenter are fetched concurrently under it.
+	"""
+	loop = asyncio.get_running_loop()
+	client = PROVIDERS[auth.provider](session_pool.get(auth))
+
+	async def call(method, *args):
+		async with semaphore:
+			return await loop.run_in_executor(executor, method, *args)
+
+	datacenters = await call(client.datacenters)
+	listings = await asyncio.gather(*(call(client.clusters, item["datacenter"]) for item in datacenters))
+	return [{
+		"name": item["name"],
+		"clusters": sorted(({
+			"id": cluster["cluster"],
+			"name": cluster["name"],
+			"features": sorted(slug for flag, (_, slug) in FEATURE_FLAGS.items() if cluster.get(flag)),
+		} for cluster in clusters), key=lambda cluster: cluster["name"]),
+	} for item, clusters in zip(datacenters, listings)]
+
+
+async def fetch_all(auths):
+	"""
+	Fetch every endpoint at once, returning an inventory or the exception raised for each.
+	"""
+	limit = settings.DATACENTER_SYNC_HOST_CONCURRENCY
+	semaphores = {}
+	for auth in auths:
+		semaphores.setdefault(host(auth), asyncio.Semaphore(limit))
+	with ThreadPoolExecutor(max_workers=max(len(auths) * limit, 1)) as executor:
+		return await asyncio.gather(*(fetch(auth, semaphores[host(auth)], executor) for auth in auths),
+		                            return_exceptions=True)
+
+
+def content_hash(item):
+	return hashlib.sha1(json.dumps(item, sort_keys=True).encode()).hexdigest()
+
+
+def fit(name, length):
+	"""
+	Truncate a name to a column length, ending a cut name with a digest of the whole so names sharing a prefix differ.
+	"""
+	if len(name) <= length:
+		return name
+	return f"{name[:length - 7]}~{hashlib.sha1(name.encode()).hexdigest()[:6]}"
+
+
+def ensure(model, field, values, defaults=None, **scope):
+	"""
+	Return {value: pk} for rows matching `field` within `scope`, bulk creating the missing ones.
+	"""
+	rows = model.objects.filter(**scope)
+	found = dict(rows.filter(**{f"{field}__in": values}).values_list(field, "pk"))
+	missing = [value for value in values if value not in found]
+	if missing:
+		model.objects.bulk_create([model(**scope, **{field: value}, **(defaults(value) if defaults else {})) for
+		                           value in missing])
+		found.update(rows.filter(**{f"{field}__in": missing}).values_list(field, "pk"))
+	return found
+
+
+def apply(auth, inventory):
+	"""
+	Upsert the datacenters of one endpoint with their cluster and feature links, skipping unchanged ones.
+
+	Datacenters are matched by name and clusters by the provider's id within the endpoint; those it no longer reports
+	are deleted.
+	"""
+	name_length = Datacenter._meta.get_field("name").max_length
+	cluster_length = Cluster._meta.get_field("name").max_length
+	existing = {datacenter.name: datacenter for datacenter in Datacenter.objects.filter(authentication=auth)}
+	items = {fit(item["name"], name_length): item for item in inventory}
+	changed = {}
+	for name, item in items.items():
+		digest = content_hash(item)
+		datacenter = existing.get(name)
+		if datacenter is None or datacenter.sync_hash != digest:
+			changed[name] = (item, digest)
+	vanished = [datacenter.pk for name, datacenter in existing.items() if name not in items]
+	if not changed and not vanished:
+		return SyncResult(auth, 0, 0, len(items), 0, None)
+
+	features = {slug: name for name, slug in FEATURE_FLAGS.values()}
+	with transaction.atomic():
+		Datacenter.objects.filter(pk__in=vanished).delete()
+		Cluster.objects.filter(authentication=auth).exclude(external_id__in=set(
+			cluster["id"] for item in items.values() for cluster in item["clusters"])).delete()
+		new = [Datacenter(name=name, slug=slugify(name)[:50], authentication=auth) for name in changed if
+		       name not in existing]
+		Datacenter.objects.bulk_create(new)
+		datacenters = dict(Datacenter.objects.filter(authentication=auth, name__in=changed).values_list("name", "pk"))
+		names = {cluster["id"]: fit(cluster["name"], cluster_length) for item, _ in changed.values() for cluster in
+		         item["clusters"]}
+		clusters = ensure(Cluster, "external_id", sorted(names), lambda id: {"name": names[id]}, authentication=auth)
+		renamed = Cluster.objects.filter(pk__in=clusters.values()).values_list("pk", "external_id", "name")
+		Cluster.objects.bulk_update([Cluster(pk=pk, name=names[id]) for pk, id, name in renamed if name != names[id]],
+		                            ["name"])
+		feature_ids = ensure(Features, "slug", sorted(features), lambda slug: {"name": features[slug]})
+
+		cluster_links = Datacenter.cluster.through
+		feature_links = Datacenter.features.through
+		ids = list(datacenters.values())
+		cluster_links.objects.filter(datacenter_id__in=ids).delete()
+		feature_links.objects.filter(datacenter_id__in=ids).delete()
+		cluster_rows = []
+		feature_rows = []
+		for name, (item, digest) in changed.items():
+			pk = datacenters[name]
+			cluster_rows.extend(cluster_links(datacenter_id=pk, cluster_id=clusters[cluster["id"]])
+			                    for cluster in item["clusters"])
+			slugs = sorted(set(slug for cluster in item["clusters"] for slug in cluster["features"]))
+			feature_rows.extend(feature_links(datacenter_id=pk, features_id=feature_ids[slug]) for slug in slugs)
+		cluster_links.objects.bulk_create(cluster_rows)
+		feature_links.objects.bulk_create(feature_rows)
+		Datacenter.objects.bulk_update([Datacenter(pk=datacenters[name], sync_hash=digest) for name, (_, digest) in
+		                                changed.items()], ["sync_hash"])
+	return SyncResult(auth, len(new), len(changed) - len(new), len(items) - len(changed), len(vanished), None)
+
+
+def sync(auths=None):
+	"""
+	Synchronize every endpoint concurrently and apply the results, returning one SyncResult per endpoint.
+	"""
+	auths = list(DatacenterAuth.objects.all() if auths is None else auths)
+	inventories = asyncio.run(fetch_all(auths))
+	results = []
+	for auth, inventory in zip(auths, inventories):
+		if isinstance(inventory, (ProviderError, OSError, http.client.HTTPException, ValueError, KeyError)):
+			results.append(SyncResult(auth, 0, 0, 0, 0, inventory))
+		elif isinstance(inventory, BaseException):
+			raise inventory
+		else:
+			results.append(apply(auth, inventory))
+	return results
@@ -1 +1,126 @@
-# Create your tests here.
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.test import TestCase
+
+from datacenter import sync
+from datacenter.models import Cluster, Datacenter, DatacenterAuth
+
+
+class VCenterHandler(BaseHTTPRequestHandler):
+	"""
+	Stand-in for the vSphere Automation REST endpoints used by the sync, serving the server's `inventory`.
+	"""
+
+	protocol_version = "HTTP/1.1"
+	delay = 0.05
+
+	def log_message(self, *args):
+		pass
+
+	def reply(self, status, value):
+		body = json.dumps({"value": value}).encode()
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def track(self):
+		with self.server.lock:
+			self.server.in_flight += 1
+			self.server.peak = max(self.server.peak, self.server.in_flight)
+		time.sleep(self.delay)
+		with self.server.lock:
+			self.server.in_flight -= 1
+
+	def do_POST(self):
+		self.track()
+		if self.path != "/rest/com/vmware/cis/session":
+			return self.reply(404, None)
+		if self.headers.get("Authorization") != "Basic " + base64.b64encode(b"user:secret").decode():
+			return self.reply(401, None)
+		return self.reply(200, "token")
+
+	def do_GET(self):
+		self.track()
+		if self.headers.get("vmware-api-session-id") != "token":
+			return self.reply(401, None)
+		url = urlsplit(self.path)
+		inventory = self.server.inventory
+		if url.path == "/rest/vcenter/datacenter":
+			return self.reply(200, [{"datacenter": f"datacenter-{i}", "name": name} for i, name in
+			                        enumerate(inventory)])
+		if url.path == "/rest/vcenter/cluster":
+			index = int(parse_qs(url.query)["filter.datacenters"][0].split("-")[1])
+			clusters = list(inventory.values())[index]
+			return self.reply(200, [{"cluster": f"domain-c{index * 100 + i}", "name": name, "drs_enabled": True,
+			                         "ha_enabled": False} for i, name in enumerate(clusters)])
+		return self.reply(404, None)
+
+
+class SyncTestCase(TestCase):
+
+	def start_server(self, inventory):
+		server = ThreadingHTTPServer(("127.0.0.1", 0), VCenterHandler)
+		server.daemon_threads = True
+		server.inventory = inventory
+		server.lock = threading.Lock()
+		server.in_flight = 0
+		server.peak = 0
+		threading.Thread(target=server.serve_forever, daemon=True).start()
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+		auth = DatacenterAuth.objects.create(hostname=f"http://127.0.0.1:{server.server_address[1]}",
+		                                     username="user", password="secret")
+		return server, auth
+
+	def test_concurrent_sync(self):
+		endpoints = [self.start_server({"Amsterdam": ["Compute", "Storage"], "Frankfurt": ["Compute"]})
+		             for _ in range(5)]
+
+		results = sync.sync()
+		self.assertEqual([(result.created, result.error) for result in results], [(2, None)] * 5)
+		# Cluster listings of an endpoint are fetched concurrently
+		self.assertTrue(all(server.peak > 1 for server, _ in endpoints))
+		# Same names on different endpoints or datacenters stay separate rows
+		self.assertEqual(Datacenter.objects.count(), 10)
+		self.assertEqual(Cluster.objects.count(), 15)
+		for _, auth in endpoints:
+			amsterdam = Datacenter.objects.get(authentication=auth, name="Amsterdam")
+			frankfurt = Datacenter.objects.get(authentication=auth, name="Frankfurt")
+			self.assertEqual(list(frankfurt.cluster.values_list("name", "authentication")), [("Compute", auth.pk)])
+			self.assertFalse(amsterdam.cluster.filter(pk__in=frankfurt.cluster.all()).exists())
+			self.assertEqual(list(frankfurt.features.values_list("slug", flat=True)), ["drs"])
+
+		results = sync.sync()
+		self.assertEqual([(result.created, result.updated, result.unchanged) for result in results], [(0, 0, 2)] * 5)
+
+		# A renamed cluster keeps its row
+		server, auth = endpoints[0]
+		cluster = Datacenter.objects.get(authentication=auth, name="Frankfurt").cluster.get()
+		server.inventory = {"Amsterdam": ["Compute", "Storage"], "Frankfurt": ["General"]}
+		sync.sync([auth])
+		cluster.refresh_from_db()
+		self.assertEqual(cluster.name, "General")
+
+	def test_removed_and_long_names(self):
+		server, auth = self.start_server({
+			"Datacenter Amsterdam North": ["Compute"],
+			"Datacenter Amsterdam South": ["Compute"],
+			"Rotterdam": ["Storage"],
+		})
+		sync.sync([auth])
+		names = sorted(Datacenter.objects.values_list("name", flat=True))
+		self.assertEqual(len(names), 3)
+		self.assertTrue(all(len(name) <= Datacenter._meta.get_field("name").max_length for name in names))
+
+		server.inventory = {"Datacenter Amsterdam North": ["Compute"]}
+		result, = sync.sync([auth])
+		self.assertEqual((result.unchanged, result.deleted), (1, 2))
+		self.assertEqual(Datacenter.objects.count(), 1)
+		self.assertEqual(list(Cluster.objects.values_list("name", flat=True)), ["Compute"])
@@ -0,0 +1,89 @@
+import base64
+import http.client
+import json
+import ssl
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+
+# Cluster flags reported by the API, mapped to the (name, slug) of the Features row they enable
+FEATURE_FLAGS = {
+	"drs_enabled": ("DRS", "drs"),
+	"ha_enabled": ("HA", "ha"),
+}
+
+
+class ProviderError(Exception):
+	pass
+
+
+class AuthenticationExpired(ProviderError):
+	pass
+
+
+class VSphereEndpoint:
+	"""
+	Connection and authentication details of the vSphere Automation REST API of one DatacenterAuth.
+	"""
+
+	SESSION_PATH = "/rest/com/vmware/cis/session"
+
+	def __init__(self, auth, timeout=None):
+		# Hostnames may carry a scheme and port, e.g. http://127.0.0.1:8080 for a lab stand-in
+		url = urlsplit(auth.hostname if "://" in auth.hostname else f"https://{auth.hostname}")
+		self.scheme = url.scheme
+		self.host = url.netloc
+		self.username = auth.username
+		self.password = auth.password
+		self.secure_ssl = auth.secure_ssl
+		self.timeout = timeout or settings.DATACENTER_SYNC_TIMEOUT
+
+	def connect(self):
+		if self.scheme == "http":
+			return http.client.HTTPConnection(self.host, timeout=self.timeout)
+		context = ssl.create_default_context()
+		if not self.secure_ssl:
+			context.check_hostname = False
+			context.verify_mode = ssl.CERT_NONE
+		return http.client.HTTPSConnection(self.host, timeout=self.timeout, context=context)
+
+	def send(self, connection, method, path, headers):
+		"""
+		Send a request on a keep-alive connection and return the "value" member of the JSON response.
+		"""
+		connection.request(method, path, headers=headers)
+		response = connection.getresponse()
+		body = response.read()
+		if response.status == 401:
+			raise AuthenticationExpired(f"{method} {path} returned 401")
+		if response.status >= 400:
+			raise ProviderError(f"{method} {path} returned {response.status}")
+		return json.loads(body or "{}").get("value")
+
+	def authenticate(self, connection):
+		"""
+		Log in and return the session token.
+		"""
+		credentials = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+		try:
+			return self.send(connection, "POST", self.SESSION_PATH, {"Authorization": f"Basic {credentials}"})
+		except AuthenticationExpired:
+			raise ProviderError(f"Invalid credentials for {self.host}")
+
+	def headers(self, token):
+		return {"vmware-api-session-id": token}
+
+
+class VSphereClient:
+	"""
+	Inventory calls of the vSphere Automation REST API, made over a pooled session.
+	"""
+
+	def __init__(self, session):
+		self.session = session
+
+	def datacenters(self):
+		return self.session.request("GET", "/rest/vcenter/datacenter")
+
+	def clusters(self, datacenter):
+		return self.session.request("GET", f"/rest/vcenter/cluster?filter.datacenters={quote(datacenter)}")
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class InventoryConfig(AppConfig):
 	name = 'inventory'
+
+	def ready(self):
+		from inventory import signals  # noqa: F401
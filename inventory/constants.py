@@ -0,0 +1,6 @@
+#
+# Caching
+#
+
+# Change counter bumped whenever a cable changes; keys cached results derived from the cable table
+CABLE_CACHE_VERSION = "inventory.cables"
@@ -0,0 +1,100 @@
+import csv
+
+from django.contrib.contenttypes.models import ContentType
+
+from inventory.models import Device
+from ipam.models import IPAddress, Service
+from utilities.bulk import chunked
+
+CSV_COLUMNS = ["id", "name", "serial", "status", "position", "face", "manufacturer", "device_type", "device_role",
+               "platform", "services", "ip_addresses"]
+
+
+def reference(obj, *fields):
+	if obj is None:
+		return None
+	return {field: getattr(obj, field) for field in ("id", "name", "slug") + fields if hasattr(obj, field)}
+
+
+def related(devices):
+	"""
+	Return ({device pk: services}, {device pk: ip addresses}) for a chunk of devices, in three queries.
+	"""
+	ids = [device.pk for device in devices]
+	services = {}
+	by_service = {}
+	for pk, device_id, name, protocol, port in Service.objects.filter(device_id__in=ids).order_by("pk").values_list(
+			"pk", "device_id", "name", "protocol", "port"):
+		service = {"id": pk, "name": name, "protocol": protocol, "port": port, "addresses": []}
+		services.setdefault(device_id, []).append(service)
+		by_service[pk] = service
+	bindings = Service.addresses.through.objects.filter(service_id__in=by_service).order_by("ipaddress_id")
+	for service_id, address in bindings.values_list("service_id", "ipaddress__address"):
+		by_service[service_id]["addresses"].append(address)
+
+	addresses = {}
+	assigned = IPAddress.objects.filter(assigned_object_type=ContentType.objects.get_for_model(Device),
+	                                    assigned_object_id__in=ids).order_by("family", "address_int")
+	for pk, device_id, address, prefix_length, vrf, status, dns_name in assigned.values_list(
+			"pk", "assigned_object_id", "address", "prefix_length", "vrf__name", "status", "dns_name"):
+		addresses.setdefault(device_id, []).append({
+			"id": pk, "address": f"{address}/{prefix_length}", "vrf": vrf, "status": status, "dns_name": dns_name,
+		})
+	return services, addresses
+
+
+def export_devices(queryset=None, chunk_size=1000):
+	"""
+	Yield every device as a dict with its type, manufacturer, role, platform, services and IP addresses.
+
+	Devices are streamed in chunks with their foreign keys joined in; services and addresses are fetched per
+	chunk, so memory use is bounded by the chunk size rather than the fleet.
+	"""
+	queryset = Device.objects.all() if queryset is None else queryset
+	queryset = queryset.select_related("device_type__manufacturer", "device_role", "platform").order_by("pk")
+	for devices in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+		services, addresses = related(devices)
+		for device in devices:
+			yield {
+				"id": device.pk,
+				"name": device.name,
+				"serial": device.serial,
+				"status": device.status,
+				"position": device.position,
+				"face": device.face,
+				"manufacturer": reference(device.device_type.manufacturer),
+				"device_type": reference(device.device_type, "model", "part_number", "u_height", "is_full_depth"),
+				"device_role": reference(device.device_role),
+				"platform": reference(device.platform),
+				"services": services.get(device.pk, []),
+				"ip_addresses": addresses.get(device.pk, []),
+			}
+
+
+def flatten(record):
+	"""
+	Return a device record as a CSV row, naming relations by slug and joining lists with semicolons.
+	"""
+	row = {column: record[column] for column in CSV_COLUMNS[:6]}
+	for column in ("manufacturer", "device_type", "device_role", "platform"):
+		row[column] = record[column]["slug"] if record[column] else ""
+	row["services"] = ";".join(f"{service['name']}/{service['protocol']}:{service['port']}"
+	                           for service in record["services"])
+	row["ip_addresses"] = ";".join(address["address"] for address in record["ip_addresses"])
+	return row
+
+
+class Echo:
+	"""
+	Write target for csv.writer that hands each formatted row back instead of buffering it.
+	"""
+
+	def write(self, value):
+		return value
+
+
+def csv_lines(records):
+	writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+	yield writer.writerow(dict(zip(CSV_COLUMNS, CSV_COLUMNS)))
+	for record in records:
+		yield writer.writerow(flatten(record))
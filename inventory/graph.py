@@ -0,0 +1,150 @@
+from django.contrib.contenttypes.models import ContentType
+
+from inventory.constants import CABLE_CACHE_VERSION
+from inventory.models import Cable, Device
+from utilities.cache import cached
+
+
+class ConnectivityGraph:
+	"""
+	Undirected multigraph of cable terminations, with every Device present as a node even when uncabled.
+
+	Nodes are (content type id, object id) pairs and edges are cables; both are loaded with values_list queries, so
+	no GenericForeignKey is ever dereferenced.
+	"""
+
+	def __init__(self, nodes, edges):
+		self.nodes = list(nodes)
+		self.index = {node: i for i, node in enumerate(self.nodes)}
+		self.edges = []
+		self.endpoints = []
+		self.adjacency = [[] for _ in self.nodes]
+		for cable, a, b in edges:
+			for node in (a, b):
+				if node not in self.index:
+					self.index[node] = len(self.nodes)
+					self.nodes.append(node)
+					self.adjacency.append([])
+			i, j = self.index[a], self.index[b]
+			self.adjacency[i].append((j, len(self.edges)))
+			self.adjacency[j].append((i, len(self.edges)))
+			self.edges.append(cable)
+			self.endpoints.append((i, j))
+		self.edge_index = {cable: i for i, cable in enumerate(self.edges)}
+
+	@classmethod
+	def from_database(cls):
+		device_type = ContentType.objects.get_for_model(Device).pk
+		devices = ((device_type, pk) for pk in Device.objects.values_list("pk", flat=True).iterator(chunk_size=10000))
+		cables = Cable.objects.values_list("pk", "termination_a_type_id", "termination_a_id", "termination_b_type_id",
+		                                   "termination_b_id").iterator(chunk_size=10000)
+		return cls(devices, ((pk, (a_type, a_id), (b_type, b_id)) for pk, a_type, a_id, b_type, b_id in cables))
+
+	def components(self, skip_node=None, skip_edge=None):
+		"""
+		Return the connected components as lists of node indexes, optionally with one node or edge removed.
+		"""
+		seen = [False] * len(self.nodes)
+		if skip_node is not None:
+			seen[skip_node] = True
+		result = []
+		for start in range(len(self.nodes)):
+			if seen[start]:
+				continue
+			seen[start] = True
+			component = [start]
+			stack = [start]
+			while stack:
+				for neighbour, edge in self.adjacency[stack.pop()]:
+					if not seen[neighbour] and edge != skip_edge:
+						seen[neighbour] = True
+						component.append(neighbour)
+						stack.append(neighbour)
+			result.append(component)
+		return result
+
+	def cut_structure(self):
+		"""
+		Return (articulation node indexes, bridge edge indexes) using an iterative Tarjan low-link search.
+		"""
+		count = len(self.nodes)
+		discovered = [-1] * count
+		low = [0] * count
+		articulation = set()
+		bridges = []
+		timer = 0
+		for root in range(count):
+			if discovered[root] != -1:
+				continue
+			discovered[root] = low[root] = timer
+			timer += 1
+			root_children = 0
+			# Frames of (node, edge used to reach it, position in its adjacency list)
+			stack = [(root, -1, 0)]
+			while stack:
+				node, via, position = stack[-1]
+				if position < len(self.adjacency[node]):
+					stack[-1] = (node, via, position + 1)
+					neighbour, edge = self.adjacency[node][position]
+					if edge == via:
+						continue
+					if discovered[neighbour] == -1:
+						discovered[neighbour] = low[neighbour] = timer
+						timer += 1
+						if node == root:
+							root_children += 1
+						stack.append((neighbour, edge, 0))
+					else:
+						low[node] = min(low[node], discovered[neighbour])
+					continue
+				stack.pop()
+				if stack:
+					parent = stack[-1][0]
+					low[parent] = min(low[parent], low[node])
+					if low[node] > discovered[parent]:
+						bridges.append(via)
+					if parent != root and low[node] >= discovered[parent]:
+						articulation.add(parent)
+			if root_children > 1:
+				articulation.add(root)
+		return articulation, bridges
+
+	def analyze(self):
+		"""
+		Return components, articulation points and bridges in terms of nodes and cable ids.
+		"""
+		articulation, bridges = self.cut_structure()
+		return {
+			"components": [[self.nodes[i] for i in component] for component in self.components()],
+			"articulation_points": sorted(self.nodes[i] for i in articulation),
+			"bridges": sorted(self.edges[i] for i in bridges),
+		}
+
+	def failure_impact(self, node=None, cable=None, root=None):
+		"""
+		Return the nodes cut off when a node or cable fails.
+
+		With a root, that is everything in the root's component no longer reachable from it. Without one, every
+		piece of the split component except the largest is reported.
+		"""
+		if node is not None:
+			skip_node, skip_edge = self.index[node], None
+			start = skip_node
+		else:
+			skip_node, skip_edge = None, self.edge_index[cable]
+			start = self.endpoints[skip_edge][0]
+		before = set(next(component for component in self.components() if start in component))
+		pieces = [set(component) for component in self.components(skip_node, skip_edge) if component[0] in before]
+		if root is not None:
+			kept = next((piece for piece in pieces if self.index[root] in piece), set())
+		else:
+			kept = max(pieces, key=len, default=set())
+		lost = before - kept - {skip_node}
+		return sorted(self.nodes[i] for i in lost)
+
+
+def analyze():
+	"""
+	Return the connectivity analysis of the whole cable plant, cached until a cable changes.
+	"""
+	return cached(CABLE_CACHE_VERSION, "analysis", lambda: ConnectivityGraph.from_database().analyze())
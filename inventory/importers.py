@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from inventory.enums import DeviceFaceChoices, DeviceStatusChoices
+from inventory.models import Device, DeviceRole, DeviceType, Manufacturer, Platform
+from inventory.racks import RackOccupancy
+from utilities.bulk import RowError, chunked, clean_status, read_records
+
+
+class SlugMap:
+	"""
+	In-memory map of every row of a reference table by slug, loaded with one query.
+	"""
+
+	def __init__(self, model, *fields):
+		self.model = model
+		self.rows = {row[0]: row[1:] for row in model.objects.values_list("slug", "pk", *fields)}
+
+	def get(self, slug, required=False):
+		"""
+		Return (pk, *fields) for a slug, or None for an optional empty value.
+		"""
+		if not slug:
+			if required:
+				raise ValidationError(f"{self.model._meta.verbose_name} is required")
+			return None
+		row = self.rows.get(slug)
+		if row is None:
+			raise ValidationError(f"Unknown {self.model._meta.verbose_name} '{slug}'")
+		return row
+
+
+def clean_face(value):
+	value = (value or "").strip()
+	if not value:
+		return ""
+	for name, label in DeviceFaceChoices.choices():
+		if value in (name, label):
+			return name
+	raise ValidationError(f"Invalid face '{value}'")
+
+
+def clean_position(value):
+	if value in (None, ""):
+		return None
+	try:
+		position = int(value)
+	except (TypeError, ValueError):
+		position = 0
+	if position < 1:
+		raise ValidationError(f"Invalid position '{value}'")
+	return position
+
+
+class DeviceImporter:
+	"""
+	Bulk device import resolving every reference from in-memory slug maps instead of per-row queries.
+	"""
+
+	def __init__(self, batch_size=1000, on_error=None):
+		self.batch_size = batch_size
+		self.on_error = on_error
+		self.manufacturers = SlugMap(Manufacturer)
+		self.device_types = SlugMap(DeviceType, "manufacturer_id", "u_height", "is_full_depth")
+		self.device_roles = SlugMap(DeviceRole)
+		self.platforms = SlugMap(Platform, "manufacturer_id")
+		self.sizes = {pk: (u_height, full_depth) for pk, _, u_height, full_depth in self.device_types.rows.values()}
+		self.occupancy = None
+		self.validate_occupancy = getattr(settings, "RACK_OCCUPANCY_VALIDATION", False)
+		self.created = 0
+		self.failed = 0
+
+	def error(self, line, message):
+		self.failed += 1
+		if self.on_error:
+			self.on_error(RowError(line, message))
+
+	def import_records(self, records):
+		"""
+		Import an iterable of (line_number, record) pairs, returning (created, failed) counts.
+		"""
+		for batch in chunked(records, self.batch_size):
+			self.import_batch(batch)
+		return self.created, self.failed
+
+	def import_file(self, source, format=None):
+		return self.import_records(read_records(source, format))
+
+	def build(self, record):
+		name = record.get("name")
+		if not name:
+			raise ValidationError("name is required")
+		device_type_id, manufacturer_id, u_height, _ = self.device_types.get(record.get("device_type"), required=True)
+		manufacturer = self.manufacturers.get(record.get("manufacturer"))
+		if manufacturer and manufacturer[0] != manufacturer_id:
+			raise ValidationError(f"Device type '{record['device_type']}' does not belong to manufacturer "
+			                      f"'{record['manufacturer']}'")
+		platform = self.platforms.get(record.get("platform"))
+		# Same rule as Device.clean, checked against the maps
+		if platform and platform[1] and platform[1] != manufacturer_id:
+			raise ValidationError(f"Platform '{record['platform']}' is limited to another manufacturer's device types")
+		obj = Device(
+			name=name,
+			device_type_id=device_type_id,
+			device_role_id=self.device_roles.get(record.get("device_role"), required=True)[0],
+			platform_id=platform[0] if platform else None,
+			serial=record.get("serial") or "",
+			position=clean_position(record.get("position")),
+			face=clean_face(record.get("face")),
+		)
+		obj.status = clean_status(record.get("status"), DeviceStatusChoices) or obj.status
+		# Same bound as Device.clean, checked whether or not overlaps are
+		if obj.position and obj.position + u_height - 1 > settings.RACK_U_HEIGHT:
+			raise ValidationError(f"A {u_height}U device cannot be placed at U{obj.position} of a "
+			                      f"{settings.RACK_U_HEIGHT}U rack.")
+		# Lengths and blanks are otherwise only caught by the database, failing the whole batch insert. References
+		# were resolved from the maps and status by clean_status, which checks stored values rather than choice names
+		exclude = [field.name for field in Device._meta.local_fields if field.many_to_one] + ["status"]
+		try:
+			obj.clean_fields(exclude=exclude)
+		except ValidationError as e:
+			raise ValidationError([f"{field}: {message}" for field, messages in e.message_dict.items()
+			                       for message in messages])
+		return obj
+
+	def place(self, obj):
+		"""
+		Reserve the units of a positioned device in the occupancy index, shared across batches.
+		"""
+		if self.occupancy is None:
+			self.occupancy = RackOccupancy.from_database()
+		u_height, full_depth = self.sizes[obj.device_type_id]
+		if not self.occupancy.is_span_free(obj.position, u_height, obj.face, full_depth):
+			raise ValidationError(f"U{obj.position}-U{obj.position + u_height - 1} is not free")
+		self.occupancy.add(None, obj.position, obj.face, u_height, full_depth)
+
+	def import_batch(self, batch):
+		objs = []
+		lines = {}
+		for line, record in batch:
+			if not isinstance(record, dict):
+				self.error(line, f"Malformed record: {record}")
+				continue
+			try:
+				obj = self.build({k: v.strip() if isinstance(v, str) else v for k, v in record.items()})
+			except ValidationError as e:
+				self.error(line, "; ".join(e.messages))
+				continue
+			if obj.serial and obj.serial in lines:
+				self.error(line, f"Duplicate of line {lines[obj.serial]}")
+				continue
+			if obj.serial:
+				lines[obj.serial] = line
+			objs.append((line, obj))
+
+		existing = set(Device.objects.filter(serial__in=list(lines)).values_list("serial", flat=True))
+		to_create = []
+		for line, obj in objs:
+			if obj.serial in existing:
+				self.error(line, f"Device with serial {obj.serial} already exists")
+				continue
+			if obj.position and self.validate_occupancy:
+				try:
+					self.place(obj)
+				except ValidationError as e:
+					self.error(line, "; ".join(e.messages))
+					continue
+			to_create.append(obj)
+
+		with transaction.atomic():
+			Device.objects.bulk_create(to_create)
+		self.created += len(to_create)
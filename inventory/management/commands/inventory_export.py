@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.export import csv_lines, export_devices
+
+
+class Command(BaseCommand):
+	help = "Stream every device with its type, role, platform, services and IP addresses as JSON Lines or CSV"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--output", help="File to write; standard output when omitted")
+		parser.add_argument("--format", choices=["csv", "jsonl"], default="jsonl", help="Output format")
+		parser.add_argument("--chunk-size", type=int, default=1000, help="Devices fetched per query")
+
+	def handle(self, *args, **options):
+		records = export_devices(chunk_size=options["chunk_size"])
+		if options["format"] == "csv":
+			lines = csv_lines(records)
+		else:
+			lines = (json.dumps(record) + "\n" for record in records)
+
+		if not options["output"]:
+			for line in lines:
+				self.stdout.write(line, ending="")
+			return
+		try:
+			with open(options["output"], "w", newline="", encoding="utf-8") as output:
+				output.writelines(lines)
+		except OSError as e:
+			raise CommandError(e)
+		self.stdout.write(f"Devices exported to {options['output']}")
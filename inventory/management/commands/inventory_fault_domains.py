@@ -0,0 +1,19 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from inventory import graph
+
+
+class Command(BaseCommand):
+	help = "Report connected components, single points of failure and bridge cables of the cable plant"
+
+	def handle(self, *args, **options):
+		analysis = graph.analyze()
+		self.stdout.write(f"{len(analysis['components'])} connected components")
+		self.stdout.write(f"{len(analysis['articulation_points'])} single points of failure")
+		for type_id, object_id in analysis["articulation_points"]:
+			model = ContentType.objects.get_for_id(type_id)
+			self.stdout.write(f"  {model.app_label}.{model.model} {object_id}")
+		self.stdout.write(f"{len(analysis['bridges'])} bridge cables")
+		for cable in analysis["bridges"]:
+			self.stdout.write(f"  cable {cable}")
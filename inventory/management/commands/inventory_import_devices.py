@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import DeviceImporter
+
+
+class Command(BaseCommand):
+	help = "Stream devices from a CSV or JSON Lines file into the database"
+
+	def add_arguments(self, parser):
+		parser.add_argument("path", help="CSV or JSON Lines file; the format follows the extension")
+		parser.add_argument("--format", choices=["csv", "jsonl"], help="Override the detected file format")
+		parser.add_argument("--batch-size", type=int, default=1000, help="Rows written per transaction")
+
+	def handle(self, *args, **options):
+		def report(error):
+			self.stderr.write(f"line {error.line}: {error.message}")
+
+		importer = DeviceImporter(batch_size=options["batch_size"], on_error=report)
+		try:
+			created, failed = importer.import_file(options["path"], options["format"])
+		except OSError as e:
+			raise CommandError(e)
+		self.stdout.write(f"{created} created, {failed} failed")
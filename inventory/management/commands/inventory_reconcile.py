@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.reconcile import Reconciliation
+
+
+class Command(BaseCommand):
+	help = "Compare a manifest of serials with the devices in the database, optionally applying its statuses"
+
+	def add_arguments(self, parser):
+		parser.add_argument("path", help="CSV or JSON Lines manifest with serial and optional name, device_type "
+		                                 "and status columns")
+		parser.add_argument("--format", choices=["csv", "jsonl"], help="Override the detected file format")
+		parser.add_argument("--apply", action="store_true", help="Update device statuses to match the manifest")
+		parser.add_argument("--batch-size", type=int, default=1000, help="Rows written per update")
+
+	def handle(self, *args, **options):
+		def report(error):
+			self.stderr.write(f"line {error.line}: {error.message}")
+
+		reconciliation = Reconciliation(batch_size=options["batch_size"], on_error=report)
+		try:
+			reconciliation.run_file(options["path"], options["format"])
+		except OSError as e:
+			raise CommandError(e)
+
+		for row in reconciliation.missing:
+			self.stdout.write(f"missing {row.serial} (line {row.line})")
+		for device in reconciliation.extra:
+			self.stdout.write(f"extra {device.serial} {device.name}")
+		for row in reconciliation.mismatched:
+			self.stdout.write(f"mismatch {row.device.serial} {row.field}: {row.ours} -> {row.theirs} (line {row.line})")
+		self.stdout.write(f"{reconciliation.matched} matched, {len(reconciliation.missing)} missing, "
+		                  f"{len(reconciliation.extra)} extra, {len(reconciliation.mismatched)} mismatched, "
+		                  f"{reconciliation.failed} failed")
+		if options["apply"]:
+			self.stdout.write(f"{reconciliation.apply_statuses()} statuses updated")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from inventory import tracing
+
+
+class Command(BaseCommand):
+	help = "Retrace every cable path and replace the stored path table"
+
+	def handle(self, *args, **options):
+		count = tracing.rebuild()
+		self.stdout.write(f"{count} paths stored")
@@ -0,0 +1,132 @@
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Q
+
+from utilities.bulk import chunked
+
+SLUG_MAX_LENGTH = 50
+
+
+class CablePathQuerySet(models.QuerySet):
+
+	def for_object(self, obj):
+		"""
+		Return the stored paths starting at an object, using the (origin_type, origin_id) index.
+		"""
+		return self.filter(origin_type=ContentType.objects.get_for_model(obj), origin_id=obj.pk)
+
+
+class DeviceQuerySet(models.QuerySet):
+
+	def overlapping(self, position, height, face, full_depth):
+		"""
+		Return the devices occupying any unit of [position, position + height - 1] on the faces given.
+		"""
+		from inventory.racks import FACES, occupied_faces
+
+		queryset = self.filter(position__lte=position + height - 1,
+		                       position__gt=position - F("device_type__u_height"))
+		if len(occupied_faces(face, full_depth)) == 1:
+			queryset = queryset.filter(Q(face=face) | Q(device_type__is_full_depth=True) | ~Q(face__in=FACES))
+		return queryset
+
+
+class SlugQuerySet(models.QuerySet):
+
+	def unique_constraints(self):
+		"""
+		Return the attnames of every single-field and unique_together constraint, other than the primary key.
+		"""
+		opts = self.model._meta
+		constraints = [(field.attname,) for field in opts.local_fields if field.unique and not field.primary_key]
+		for fields in opts.unique_together:
+			constraints.append(tuple(opts.get_field(name).attname for name in fields))
+		return constraints
+
+	def assign_slugs(self, objs):
+		"""
+		Slugify every object without a slug, suffixing -2, -3, ... in batch order when a slug is already taken.
+		"""
+		generated = [obj for obj in objs if not obj.slug]
+		taken = set(obj.slug for obj in objs if obj.slug)
+		for obj in generated:
+			obj.slug = obj.create_slug(getattr(obj, self.model.SLUG_SOURCE))
+		if not generated:
+			return
+		bases = Counter(obj.slug for obj in generated)
+		taken |= set(self.filter(slug__in=bases).values_list("slug", flat=True))
+		clashes = [base for base, count in bases.items() if count > 1 or base in taken]
+		if clashes:
+			# Suffixed candidates share the first characters of their base, so one query finds them all
+			query = Q()
+			for base in clashes:
+				query |= Q(slug__startswith=base[:SLUG_MAX_LENGTH - 10])
+			taken |= set(self.filter(query).values_list("slug", flat=True))
+		for obj in generated:
+			base, number = obj.slug, 1
+			while obj.slug in taken:
+				number += 1
+				suffix = f"-{number}"
+				obj.slug = base[:SLUG_MAX_LENGTH - len(suffix)] + suffix
+			taken.add(obj.slug)
+
+	def bulk_create_validated(self, objs, batch_size=1000, on_error=None):
+		"""
+		Slugify, validate and insert objects, with one query per foreign key and per unique constraint.
+
+		Invalid objects are passed to on_error(obj, error) and skipped; without on_error, nothing is inserted and
+		a ValidationError keyed by batch position is raised. Returns the created objects.
+		"""
+		objs = list(objs)
+		self.assign_slugs(objs)
+		errors = {}
+
+		def fail(i, error):
+			errors.setdefault(i, []).extend(error.messages)
+
+		foreign_keys = [field for field in self.model._meta.local_fields if field.many_to_one]
+		for i, obj in enumerate(objs):
+			try:
+				obj.clean_fields(exclude=[field.name for field in foreign_keys])
+			except ValidationError as e:
+				fail(i, e)
+
+		for field in foreign_keys:
+			values = set(getattr(obj, field.attname) for obj in objs) - {None}
+			found = set(field.related_model._default_manager.filter(pk__in=values).values_list("pk", flat=True))
+			for i, obj in enumerate(objs):
+				value = getattr(obj, field.attname)
+				if value is None and not field.null:
+					fail(i, ValidationError(f"{field.verbose_name} is required"))
+				elif value is not None and value not in found:
+					fail(i, ValidationError(f"{field.verbose_name} {value} does not exist"))
+
+		for fields in self.unique_constraints():
+			keys = [tuple(getattr(obj, name) for name in fields) for obj in objs]
+			# Filtering each column by IN returns a superset of the matching combinations
+			lookup = {f"{name}__in": set(key[n] for key in keys) for n, name in enumerate(fields)}
+			existing = set(self.filter(**lookup).values_list(*fields))
+			seen = {}
+			for i, key in enumerate(keys):
+				label = ", ".join(fields)
+				if key in existing:
+					fail(i, ValidationError(f"{self.model._meta.verbose_name} with this {label} already exists"))
+				elif key in seen:
+					fail(i, ValidationError(f"Duplicate {label} of object {seen[key]}"))
+				else:
+					seen[key] = i
+
+		if errors and on_error is None:
+			raise ValidationError({str(i): messages for i, messages in errors.items()})
+		for i, messages in errors.items():
+			on_error(objs[i], ValidationError(messages))
+
+		valid = [obj for i, obj in enumerate(objs) if i not in errors]
+		created = []
+		with transaction.atomic():
+			for chunk in chunked(valid, batch_size):
+				created.extend(self.bulk_create(chunk))
+		return created
@@ -1,4 +1,5 @@
 from colorfield.fields import ColorField
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
@@ -7,6 +8,7 @@ from django.utils.translation import gettext_lazy as _
 from slugify import slugify
 
 from inventory.enums import CableLengthUnit, CableStatus, CableTypes, DeviceFaceChoices, DeviceStatusChoices
+from inventory.managers import CablePathQuerySet, DeviceQuerySet, SlugQuerySet
 
 
 # Create your models here.
@@ -31,10 +33,32 @@ class Cable(models.Model):
 	class Meta:
 		verbose_name = _("cable")
 		verbose_name_plural = _("cables")
+		indexes = [
+			models.Index(fields=["termination_a_type", "termination_a_id"]),
+			models.Index(fields=["termination_b_type", "termination_b_id"]),
+		]
 
 	def __str__(self):
 		return self.label or '#{}'.format(self.pk)
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Remember the original ends so paths through them can be retraced when the cable moves
+		instance._loaded_nodes = instance.nodes
+		return instance
+
+	@property
+	def nodes(self):
+		"""
+		Return the (content type id, object id) pairs of both terminations.
+		"""
+		fields = self.__dict__
+		return [
+			(fields.get("termination_a_type_id"), fields.get("termination_a_id")),
+			(fields.get("termination_b_type_id"), fields.get("termination_b_id")),
+		]
+
 	def clean(self):
 		# A termination point cannot be connected to itself
 		if self.termination_a == self.termination_b:
@@ -46,6 +70,10 @@ class Manufacturer(models.Model):
 	slug = models.SlugField(unique=True, verbose_name=_("slug"))
 	description = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("description"))
 
+	objects = SlugQuerySet.as_manager()
+
+	SLUG_SOURCE = "name"
+
 	class Meta:
 		verbose_name = _("manufacturer")
 		verbose_name_plural = _("manufacturers")
@@ -77,6 +105,10 @@ class DeviceType(models.Model):
 	front_image = models.ImageField(upload_to="device-type", blank=True, verbose_name=_("front image"))
 	rear_image = models.ImageField(upload_to="device-type", blank=True, verbose_name=_("rear image"))
 
+	objects = SlugQuerySet.as_manager()
+
+	SLUG_SOURCE = "model"
+
 	class Meta:
 		verbose_name = _("device type")
 		verbose_name_plural = _("device types")
@@ -108,6 +140,10 @@ class DeviceRole(models.Model):
 	vm_role = models.BooleanField(default=True, verbose_name=_("vm role"))
 	description = models.CharField(max_length=100, blank=True, null=True, verbose_name=_("description"))
 
+	objects = SlugQuerySet.as_manager()
+
+	SLUG_SOURCE = "name"
+
 	class Meta:
 		verbose_name = _("device role")
 		verbose_name_plural = _("device roles")
@@ -134,6 +170,10 @@ class Platform(models.Model):
 	manufacturer = models.ForeignKey(to=Manufacturer, on_delete=models.PROTECT, related_name="platforms",
 	                                 verbose_name=_("manufacturer"))
 
+	objects = SlugQuerySet.as_manager()
+
+	SLUG_SOURCE = "name"
+
 	class Meta:
 		verbose_name = _("platform")
 		verbose_name_plural = _("platforms")
@@ -162,15 +202,20 @@ class Device(models.Model):
 	                                verbose_name=_("device role"))
 	platform = models.ForeignKey(to=Platform, on_delete=models.SET_NULL, verbose_name=_("platform"),
 	                             related_name="devices", blank=True, null=True)
-	serial = models.CharField(max_length=100, verbose_name=_("serial"))
+	serial = models.CharField(max_length=100, db_index=True, verbose_name=_("serial"))
 	position = models.PositiveSmallIntegerField(blank=True, null=True, verbose_name=_("position"))
 	face = models.CharField(max_length=50, blank=True, choices=DeviceFaceChoices.choices(), verbose_name=_("rack face"))
 	status = models.CharField(max_length=50, choices=DeviceStatusChoices.choices(), verbose_name=_("status"),
 	                          default=DeviceStatusChoices.STATUS_ACTIVE.value)
 
+	objects = DeviceQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = _("device")
 		verbose_name_plural = _("devices")
+		indexes = [
+			models.Index(fields=["position", "face"]),
+		]
 
 	def __str__(self):
 		return self.name
@@ -183,3 +228,48 @@ class Device(models.Model):
 					'platform': "The assigned platform is limited to {} device types, but this device's type belongs "
 					            "to {}.".format(self.platform.manufacturer, self.device_type.manufacturer)
 				})
+
+		# Validate rack placement
+		if hasattr(self, 'device_type') and self.position:
+			height = self.device_type.u_height
+			if self.position + height - 1 > settings.RACK_U_HEIGHT:
+				raise ValidationError({
+					'position': "A {}U device cannot be placed at U{} of a {}U rack.".format(
+						height, self.position, settings.RACK_U_HEIGHT)
+				})
+			if not getattr(settings, "RACK_OCCUPANCY_VALIDATION", False):
+				return
+			overlapping = Device.objects.overlapping(self.position, height, self.face, self.device_type.is_full_depth)
+			conflict = overlapping.exclude(pk=self.pk).first()
+			if conflict:
+				raise ValidationError({
+					'position': "U{}-U{} overlaps {}.".format(self.position, self.position + height - 1, conflict)
+				})
+
+
+class CablePath(models.Model):
+	origin_type = models.ForeignKey(to=ContentType, on_delete=models.CASCADE, related_name="+",
+	                                verbose_name=_("origin type"))
+	origin_id = models.PositiveIntegerField(verbose_name=_("origin id"))
+	origin = GenericForeignKey(ct_field="origin_type", fk_field="origin_id")
+	destination_type = models.ForeignKey(to=ContentType, on_delete=models.CASCADE, related_name="+", blank=True,
+	                                     null=True, verbose_name=_("destination type"))
+	destination_id = models.PositiveIntegerField(blank=True, null=True, verbose_name=_("destination id"))
+	destination = GenericForeignKey(ct_field="destination_type", fk_field="destination_id")
+	cables = models.ManyToManyField(to=Cable, related_name="paths", verbose_name=_("cables"))
+	hops = models.JSONField(default=list, verbose_name=_("hops"))
+	is_complete = models.BooleanField(default=False, verbose_name=_("complete"))
+	is_loop = models.BooleanField(default=False, verbose_name=_("loop"))
+
+	objects = CablePathQuerySet.as_manager()
+
+	class Meta:
+		verbose_name = _("cable path")
+		verbose_name_plural = _("cable paths")
+		indexes = [
+			models.Index(fields=["origin_type", "origin_id"]),
+			models.Index(fields=["destination_type", "destination_id"]),
+		]
+
+	def __str__(self):
+		return "{} -> {}".format(self.origin_id, self.destination_id)
@@ -0,0 +1,97 @@
+from django.conf import settings
+
+from inventory.enums import DeviceFaceChoices
+from utilities.bits import bit_runs, first_run
+
+FACES = tuple(name for name, _ in DeviceFaceChoices.choices())
+
+
+def span_mask(position, height):
+	"""
+	Return the bitmap of units [position, position + height - 1]; unit 1 is bit 0.
+	"""
+	return ((1 << height) - 1) << (position - 1)
+
+
+def occupied_faces(face, full_depth):
+	"""
+	Return the faces a device occupies; full-depth devices and devices without a face block both.
+	"""
+	if full_depth or face not in FACES:
+		return FACES
+	return (face,)
+
+
+class RackOccupancy:
+	"""
+	Per-face unit bitmaps of every positioned device, built from a single joined query.
+
+	Devices carry a position and face but no rack, so all positioned devices share one elevation of
+	RACK_U_HEIGHT units.
+	"""
+
+	def __init__(self, devices=(), height=None):
+		self.height = height or settings.RACK_U_HEIGHT
+		self.bitmaps = {face: 0 for face in FACES}
+		self.owners = {face: [None] * (self.height + 1) for face in FACES}
+		for pk, position, face, u_height, full_depth in devices:
+			self.add(pk, position, face, u_height, full_depth)
+
+	@classmethod
+	def from_database(cls, queryset=None, height=None):
+		from inventory.models import Device
+
+		queryset = Device.objects.all() if queryset is None else queryset
+		devices = queryset.filter(position__isnull=False).values_list("pk", "position", "face", "device_type__u_height",
+		                                                             "device_type__is_full_depth")
+		return cls(devices.iterator(), height)
+
+	def add(self, pk, position, face, u_height, full_depth):
+		last = min(position + u_height - 1, self.height)
+		for face in occupied_faces(face, full_depth):
+			self.bitmaps[face] |= span_mask(position, last - position + 1)
+			for unit in range(position, last + 1):
+				self.owners[face][unit] = pk
+
+	def free_mask(self, face=None, full_depth=False):
+		used = 0
+		for face in occupied_faces(face, full_depth):
+			used |= self.bitmaps[face]
+		return span_mask(1, self.height) & ~used
+
+	def is_span_free(self, position, height, face=None, full_depth=False):
+		"""
+		Return True if units [position, position + height - 1] are free on the faces the device would occupy.
+		"""
+		if position < 1 or position + height - 1 > self.height:
+			return False
+		mask = span_mask(position, height)
+		return self.free_mask(face, full_depth) & mask == mask
+
+	def first_free(self, height, face=None, full_depth=False):
+		"""
+		Return the lowest position where a device `height` units tall fits, or None.
+		"""
+		start = first_run(self.free_mask(face, full_depth), height)
+		return None if start is None else start + 1
+
+	def free_spans(self, face=None, full_depth=False):
+		"""
+		Yield (first, last) unit ranges free on the given faces, lowest first.
+		"""
+		for first, last in bit_runs(self.free_mask(face, full_depth)):
+			yield first + 1, last + 1
+
+	def occupant(self, position, face):
+		"""
+		Return the pk of the device occupying a unit on a face, or None.
+		"""
+		return self.owners[face][position]
+
+	def utilization(self):
+		"""
+		Return {unit: {face: device pk or None}} for every unit, plus the percentage of occupied unit faces.
+		"""
+		units = {unit: {face: self.owners[face][unit] for face in FACES} for unit in range(1, self.height + 1)}
+		used = sum(bin(bitmap).count("1") for bitmap in self.bitmaps.values())
+		return units, round(100 * used / (self.height * len(FACES)), 2)
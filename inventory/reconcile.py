@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from inventory.enums import DeviceStatusChoices
+from inventory.models import Device
+from utilities.bulk import RowError, chunked, clean_status, read_records
+
+DeviceRow = namedtuple("DeviceRow", ["pk", "serial", "name", "device_type", "status"])
+Missing = namedtuple("Missing", ["line", "serial"])
+Mismatch = namedtuple("Mismatch", ["line", "device", "field", "ours", "theirs"])
+
+# Manifest columns compared against the projection, when present in a row
+COMPARED_FIELDS = ["name", "device_type", "status"]
+
+
+class Reconciliation:
+	"""
+	Diff a serial manifest against the devices in the database with a hash join keyed on serial.
+
+	The device side is loaded once as a projection of plain tuples; the manifest is streamed and probed
+	against it, so only the differences are kept in memory.
+	"""
+
+	def __init__(self, batch_size=1000, on_error=None):
+		self.batch_size = batch_size
+		self.on_error = on_error
+		self.missing = []
+		self.mismatched = []
+		self.extra = []
+		self.matched = 0
+		self.failed = 0
+		# Devices whose status differs from the manifest, with the manifest status
+		self.status_changes = {}
+
+	def error(self, line, message):
+		self.failed += 1
+		if self.on_error:
+			self.on_error(RowError(line, message))
+
+	def projection(self):
+		"""
+		Return {serial: [DeviceRow]}; serials are not unique, so every device sharing one is kept.
+		"""
+		devices = {}
+		rows = Device.objects.exclude(serial="").values_list("pk", "serial", "name", "device_type__slug", "status")
+		for row in rows.iterator(chunk_size=10000):
+			devices.setdefault(row[1], []).append(DeviceRow(*row))
+		return devices
+
+	def run(self, records):
+		devices = self.projection()
+		seen = {}
+		for line, record in records:
+			if not isinstance(record, dict):
+				self.error(line, f"Malformed record: {record}")
+				continue
+			record = {k: v.strip() if isinstance(v, str) else v for k, v in record.items()}
+			serial = record.get("serial")
+			if not serial:
+				self.error(line, "serial is required")
+				continue
+			if serial in seen:
+				self.error(line, f"Duplicate of line {seen[serial]}")
+				continue
+			seen[serial] = line
+			try:
+				record["status"] = clean_status(record.get("status"), DeviceStatusChoices)
+			except ValidationError as e:
+				self.error(line, "; ".join(e.messages))
+				continue
+			matches = devices.get(serial)
+			if not matches:
+				self.missing.append(Missing(line, serial))
+				continue
+			self.matched += 1
+			for device in matches:
+				self.compare(line, device, record)
+
+		self.extra = [device for serial, matches in devices.items() if serial not in seen for device in matches]
+		return self
+
+	def run_file(self, source, format=None):
+		return self.run(read_records(source, format))
+
+	def compare(self, line, device, record):
+		for field in COMPARED_FIELDS:
+			theirs = record.get(field)
+			ours = getattr(device, field)
+			if theirs and theirs != ours:
+				self.mismatched.append(Mismatch(line, device, field, ours, theirs))
+				if field == "status":
+					self.status_changes[device.pk] = theirs
+
+	def apply_statuses(self):
+		"""
+		Set the manifest status on every mismatched device, in chunked bulk updates. Returns the count.
+		"""
+		updated = 0
+		with transaction.atomic():
+			for chunk in chunked(self.status_changes.items(), self.batch_size):
+				objs = [Device(pk=pk, status=status) for pk, status in chunk]
+				Device.objects.bulk_update(objs, ["status"])
+				updated += len(objs)
+		return updated
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from inventory import tracing
+from inventory.constants import CABLE_CACHE_VERSION
+from inventory.models import Cable
+from utilities.cache import bump_version
+
+
+@receiver(post_save, sender=Cable)
+def cable_saved(sender, instance, raw=False, **kwargs):
+	if raw:
+		return
+	nodes = set(getattr(instance, "_loaded_nodes", [])) | set(instance.nodes)
+	instance._loaded_nodes = instance.nodes
+	transaction.on_commit(lambda: tracing.invalidate(nodes))
+	transaction.on_commit(lambda: bump_version(CABLE_CACHE_VERSION))
+
+
+@receiver(post_delete, sender=Cable)
+def cable_deleted(sender, instance, **kwargs):
+	nodes = instance.nodes
+	transaction.on_commit(lambda: tracing.invalidate(nodes))
+	transaction.on_commit(lambda: bump_version(CABLE_CACHE_VERSION))
@@ -1 +1,30 @@
-# Create your tests here.
+from django.test import TestCase
+
+from inventory import tracing
+from inventory.models import Cable, CablePath, Device, DeviceRole, DeviceType, Manufacturer, Platform
+
+
+class TracingTestCase(TestCase):
+
+	def setUp(self):
+		manufacturer = Manufacturer.objects.create(name="Acme")
+		device_type = DeviceType.objects.create(manufacturer=manufacturer, model="X1")
+		role = DeviceRole.objects.create(name="Server", color="#ffffff")
+		self.devices = [Device.objects.create(name=f"device{i}", device_type=device_type, device_role=role,
+		                                      serial=str(i)) for i in range(4)]
+		# Any model outside CABLE_ENDPOINT_MODELS with two cables is traced through, like a patch panel
+		self.panels = [Platform.objects.create(name=f"panel{i}", manufacturer=manufacturer) for i in range(2)]
+
+	def connect(self, a, b):
+		return Cable.objects.create(termination_a=a, termination_b=b)
+
+	def test_retrace_two_origins(self):
+		first = [self.connect(self.devices[0], self.panels[0]), self.connect(self.panels[0], self.devices[1])]
+		second = [self.connect(self.devices[2], self.panels[1]), self.connect(self.panels[1], self.devices[3])]
+		origins = [(cable.termination_a_type_id, cable.termination_a_id) for cable in (first[0], second[0])]
+
+		self.assertEqual(tracing.retrace(origins), 2)
+		for device, cables in ((self.devices[0], first), (self.devices[2], second)):
+			path = CablePath.objects.get(origin_id=device.pk)
+			self.assertEqual(path.hops, [cable.pk for cable in cables])
+			self.assertEqual(sorted(path.cables.values_list("pk", flat=True)), sorted(cable.pk for cable in cables))
@@ -0,0 +1,182 @@
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+
+from inventory.models import Cable, CablePath
+
+Trace = namedtuple("Trace", ["origin", "destination", "cables", "is_complete", "is_loop"])
+
+CABLE_COLUMNS = ("pk", "termination_a_type_id", "termination_a_id", "termination_b_type_id", "termination_b_id")
+
+
+def endpoint_types():
+	types = set()
+	for label in getattr(settings, "CABLE_ENDPOINT_MODELS", []):
+		app_label, model = label.lower().split(".")
+		types.add(ContentType.objects.get_by_natural_key(app_label, model).pk)
+	return types
+
+
+class CableIndex:
+	"""
+	Adjacency of (content type id, object id) nodes through cables.
+
+	CableIndex.load() reads every cable in one pass. A plain CableIndex() fills itself lazily, one indexed query per
+	node visited, which is cheaper when only a few paths need retracing.
+	"""
+
+	def __init__(self):
+		self.adjacency = defaultdict(list)
+		self.complete = False
+		self.loaded = set()
+		self.endpoints = endpoint_types()
+
+	@classmethod
+	def load(cls):
+		index = cls()
+		index.add(Cable.objects.values_list(*CABLE_COLUMNS).iterator(chunk_size=10000))
+		index.complete = True
+		return index
+
+	def add(self, rows):
+		for pk, a_type, a_id, b_type, b_id in rows:
+			self.adjacency[a_type, a_id].append((pk, (b_type, b_id)))
+			self.adjacency[b_type, b_id].append((pk, (a_type, a_id)))
+
+	def neighbours(self, node):
+		"""
+		Return the (cable id, far node) pairs attached to a node.
+		"""
+		if not self.complete and node not in self.loaded:
+			self.loaded.add(node)
+			cables = Cable.objects.filter(
+				Q(termination_a_type_id=node[0], termination_a_id=node[1]) |
+				Q(termination_b_type_id=node[0], termination_b_id=node[1])
+			).values_list(*CABLE_COLUMNS)
+			for pk, a_type, a_id, b_type, b_id in cables:
+				if (a_type, a_id) == node:
+					self.adjacency[node].append((pk, (b_type, b_id)))
+				if (b_type, b_id) == node:
+					self.adjacency[node].append((pk, (a_type, a_id)))
+		return self.adjacency.get(node, [])
+
+	def is_passthrough(self, node):
+		return node[0] not in self.endpoints and len(self.neighbours(node)) == 2
+
+	def trace(self, origin):
+		"""
+		Yield a Trace for every cable leaving the origin, following pass-through objects hop by hop.
+		"""
+		for cable, node in self.neighbours(origin):
+			cables = [cable]
+			seen = {cable}
+			loop = False
+			while node != origin and self.is_passthrough(node):
+				cable, node = next(hop for hop in self.neighbours(node) if hop[0] != cables[-1])
+				if cable in seen:
+					loop = True
+					break
+				seen.add(cable)
+				cables.append(cable)
+			# Paths running into a dangling pass-through object are left incomplete
+			complete = not loop and node != origin and (node[0] in self.endpoints or len(self.neighbours(node)) != 1)
+			yield Trace(origin, node, cables, complete, loop)
+
+	def origins(self):
+		"""
+		Return every node a path can start from: cabled nodes that are not traced through.
+		"""
+		return [node for node in list(self.adjacency) if not self.is_passthrough(node)]
+
+
+def save_paths(traces, batch_size=1000):
+	"""
+	Store traces as CablePath rows, with their cable memberships, using bulk inserts.
+
+	Backends that cannot return primary keys from bulk inserts (SQLite on this Django) get one insert per path, since
+	reading the keys back could pick up paths saved by another retrace at the same time.
+	"""
+	traces = list(traces)
+	paths = [
+		CablePath(origin_type_id=trace.origin[0], origin_id=trace.origin[1], destination_type_id=trace.destination[0],
+		          destination_id=trace.destination[1], hops=trace.cables, is_complete=trace.is_complete,
+		          is_loop=trace.is_loop)
+		for trace in traces
+	]
+	through = CablePath.cables.through
+	with transaction.atomic():
+		if connection.features.can_return_rows_from_bulk_insert:
+			CablePath.objects.bulk_create(paths, batch_size=batch_size)
+		else:
+			for path in paths:
+				path.save()
+		through.objects.bulk_create([
+			through(cablepath_id=path.pk, cable_id=cable)
+			for path, trace in zip(paths, traces)
+			for cable in set(trace.cables)
+		], batch_size=batch_size)
+	return len(paths)
+
+
+def node_filter(prefix, nodes):
+	"""
+	Return a Q matching rows whose <prefix>_type/<prefix>_id pair is one of the nodes.
+	"""
+	grouped = defaultdict(set)
+	for content_type, object_id in nodes:
+		grouped[content_type].add(object_id)
+	query = Q(pk__in=[])
+	for content_type, ids in grouped.items():
+		query |= Q(**{f"{prefix}_type_id": content_type, f"{prefix}_id__in": ids})
+	return query
+
+
+def retrace(nodes, index=None):
+	"""
+	Replace the stored paths of the given origin nodes with fresh traces.
+	"""
+	index = index or CableIndex()
+	nodes = set(node for node in nodes if None not in node)
+	with transaction.atomic():
+		CablePath.objects.filter(node_filter("origin", nodes)).delete()
+		traces = [trace for node in nodes if not index.is_passthrough(node) for trace in index.trace(node)]
+		return save_paths(traces)
+
+
+def invalidate(cable_nodes):
+	"""
+	Retrace every path affected by a cable whose ends are the given nodes.
+
+	Affected paths are those starting or ending at either end, or running over any cable attached to them (their
+	ends may have stopped or started being pass-through). Both ends of those paths are retraced.
+	"""
+	cable_nodes = set(node for node in cable_nodes if None not in node)
+	if not cable_nodes:
+		return 0
+	attached = Cable.objects.filter(node_filter("termination_a", cable_nodes) | node_filter("termination_b", cable_nodes))
+	affected = CablePath.objects.filter(
+		Q(cables__in=attached) | node_filter("origin", cable_nodes) | node_filter("destination", cable_nodes)
+	).values_list("origin_type_id", "origin_id", "destination_type_id", "destination_id").distinct()
+
+	nodes = set(cable_nodes)
+	for origin_type, origin_id, destination_type, destination_id in affected:
+		nodes.add((origin_type, origin_id))
+		nodes.add((destination_type, destination_id))
+	index = CableIndex()
+	# Ends reached through the new layout need their reverse paths too
+	destinations = set(trace.destination for node in nodes if None not in node and not index.is_passthrough(node)
+	                   for trace in index.trace(node))
+	return retrace(nodes | destinations, index)
+
+
+def rebuild(batch_size=1000):
+	"""
+	Recompute every stored path from a full in-memory index of the cable table.
+	"""
+	index = CableIndex.load()
+	with transaction.atomic():
+		CablePath.objects.all().delete()
+		return save_paths((trace for node in index.origins() for trace in index.trace(node)), batch_size)
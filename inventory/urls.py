@@ -0,0 +1,9 @@
+from django.urls import path
+
+from inventory import views
+
+app_name = "inventory"
+
+urlpatterns = [
+	path("devices/export/", views.device_export, name="device_export"),
+]
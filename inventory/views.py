@@ -1 +1,26 @@
-# Create your views here.
+import json
+
+from django.contrib.auth.decorators import login_required, permission_required
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from inventory.export import csv_lines, export_devices
+
+
+@require_GET
+@login_required
+@permission_required(("inventory.view_device", "ipam.view_service", "ipam.view_ipaddress"), raise_exception=True)
+def device_export(request):
+	"""
+	Stream every device with its relations as JSON lines, or as CSV with ?format=csv.
+	"""
+	format = request.GET.get("format", "jsonl")
+	records = export_devices()
+	if format == "csv":
+		response = StreamingHttpResponse(csv_lines(records), content_type="text/csv")
+		response["Content-Disposition"] = 'attachment; filename="devices.csv"'
+		return response
+	if format == "jsonl":
+		return StreamingHttpResponse((json.dumps(record) + "\n" for record in records),
+		                             content_type="application/x-ndjson")
+	return HttpResponseBadRequest(f"Unknown format '{format}'")
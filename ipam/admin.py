@@ -1,5 +1,11 @@
 from django.contrib import admin
+from django.core.exceptions import ObjectDoesNotExist
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.html import format_html
 
+from ipam import summarize
+from ipam.enums import PrefixStatusChoices
 from ipam.models import Aggregate, IPAddress, Prefix, RIR, Service, VLAN, VLANGroup, VRF
 
 
@@ -19,24 +25,79 @@ class RIRAdmin(admin.ModelAdmin):
 	list_filter = ["is_private"]
 
 
+def utilization(obj):
+	# Read from the materialized table; rows appear after ipam_refresh_utilization has run
+	try:
+		return f"{obj.utilization.utilization}%"
+	except ObjectDoesNotExist:
+		return "-"
+
+
 @admin.register(Aggregate)
 class AggregateAdmin(admin.ModelAdmin):
-	list_display = ["prefix", "rir"]
+	list_display = ["prefix", "rir", utilization]
+	list_select_related = ["rir", "utilization"]
 
 
 @admin.register(Prefix)
 class PrefixAdmin(admin.ModelAdmin):
-	list_display = ["prefix", "vrf", "vlan", "status", "is_pool"]
+	list_display = ["prefix_tree", "vrf", "vlan", "status", "is_pool", "child_count", "descendant_count", utilization]
 	list_filter = ["status", "is_pool"]
+	list_select_related = ["vrf", "vlan", "utilization"]
 	search_fields = ["vrf__name", "vlan__name", "vlan__id"]
+	ordering = ["vrf", "family", "network_start", "prefix_length"]
+
+	def prefix_tree(self, obj):
+		return format_html("<span style=\"padding-left: {}em\">{}</span>", obj.depth * 1.5, obj.prefix)
+
+	prefix_tree.short_description = "Prefix"
+	prefix_tree.admin_order_field = "network_start"
+
+	def get_urls(self):
+		return [
+			path("summary/", self.admin_site.admin_view(self.summary_view), name="ipam_prefix_summary"),
+		] + super().get_urls()
+
+	def summary_view(self, request):
+		vrf_id = int(request.GET["vrf"]) if request.GET.get("vrf", "").isdigit() else None
+		status = request.GET.get("status") or None
+		context = dict(
+			self.admin_site.each_context(request),
+			opts=self.model._meta,
+			title="Prefix summary",
+			vrfs=VRF.objects.order_by("name"),
+			statuses=[choice.value for choice in PrefixStatusChoices],
+			vrf_id=vrf_id,
+			status=status,
+			summaries=summarize.cached_summary(vrf_id, status),
+		)
+		return TemplateResponse(request, "admin/ipam/prefix/summary.html", context)
 
 
 @admin.register(IPAddress)
 class IPAddressAdmin(admin.ModelAdmin):
-	list_display = ["address", "vrf", "status", "assigned_object", "nat_inside", "dns_name"]
+	list_display = ["address", "vrf", "status", "assigned_object", "nat_inside_chain", "dns_name"]
 	list_filter = ["status"]
+	list_select_related = ["vrf"]
 	search_fields = ["vrf__name", "address"]
 
+	def get_changelist_instance(self, request):
+		changelist = super().get_changelist_instance(request)
+		# Resolve the NAT chains of the whole page at once instead of one query per row
+		chains = IPAddress.objects.nat_chains(changelist.result_list)
+		for obj in changelist.result_list:
+			obj.nat_chain = chains.get(obj.pk)
+		return changelist
+
+	def nat_inside_chain(self, obj):
+		chain = getattr(obj, "nat_chain", None)
+		if not chain or not chain.inside:
+			return "-"
+		hops = " \u2192 ".join(hop.address for hop in chain.inside)
+		return f"{hops} (loop)" if chain.cycle else hops
+
+	nat_inside_chain.short_description = "NAT inside"
+
 
 @admin.register(VLANGroup)
 class VLANGroupAdmin(admin.ModelAdmin):
@@ -55,8 +116,12 @@ class VLANAdmin(admin.ModelAdmin):
 class ServiceAdmin(admin.ModelAdmin):
 	list_display = ["name", "device", "protocol", "port", "ip_addresses"]
 	list_filter = ["device__name", "protocol"]
+	list_select_related = ["device"]
 	search_fields = ["name", "addresses__address"]
 
+	def get_queryset(self, request):
+		return super().get_queryset(request).prefetch_related("addresses")
+
 	def ip_addresses(self, obj):
 		return ", ".join([o.address for o in obj.addresses.all()])
 
@@ -0,0 +1,71 @@
+def merge_ranges(ranges):
+	"""
+	Merge sorted (start, end) ranges, collapsing nested, overlapping and adjacent ones.
+	"""
+	current = None
+	for start, end in ranges:
+		if current is None:
+			current = [start, end]
+		elif start <= current[1] + 1:
+			current[1] = max(current[1], end)
+		else:
+			yield tuple(current)
+			current = [start, end]
+	if current is not None:
+		yield tuple(current)
+
+
+def free_ranges(start, end, occupied):
+	"""
+	Yield the (start, end) gaps of [start, end] not covered by the sorted occupied ranges.
+	"""
+	cursor = start
+	for used_start, used_end in merge_ranges(occupied):
+		if used_end < cursor:
+			continue
+		if used_start > end:
+			break
+		if used_start > cursor:
+			yield cursor, used_start - 1
+		cursor = used_end + 1
+		if cursor > end:
+			return
+	if cursor <= end:
+		yield cursor, end
+
+
+def first_fit(gaps, size):
+	"""
+	Return the first block start aligned to `size` (a power of two) that fits entirely inside one of the gaps.
+	"""
+	for gap_start, gap_end in gaps:
+		candidate = (gap_start + size - 1) // size * size
+		if candidate + size - 1 <= gap_end:
+			return candidate
+	return None
+
+
+def take(gaps, count):
+	"""
+	Return the first `count` integers found in the gaps, as a list.
+	"""
+	values = []
+	for gap_start, gap_end in gaps:
+		needed = count - len(values)
+		values.extend(range(gap_start, min(gap_end, gap_start + needed - 1) + 1))
+		if len(values) >= count:
+			break
+	return values
+
+
+def range_to_cidrs(start, end, bits):
+	"""
+	Yield (network, prefix_length) for the minimal list of CIDR blocks exactly covering [start, end].
+	"""
+	while start <= end:
+		# The largest block aligned on start, shrunk until it fits
+		size = start & -start if start else 1 << bits
+		while size > end - start + 1:
+			size >>= 1
+		yield start, bits - size.bit_length() + 1
+		start += size
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class IpamConfig(AppConfig):
 	name = 'ipam'
+
+	def ready(self):
+		from ipam import signals  # noqa: F401
@@ -18,3 +18,26 @@ VRF_RD_MAX_LENGTH = 21
 #
 PREFIX_LENGTH_MIN = 1
 PREFIX_LENGTH_MAX = 127  # IPv6
+
+#
+# Address families
+#
+IP_FAMILY_CHOICES = (
+	(4, "IPv4"),
+	(6, "IPv6"),
+)
+
+#
+# VLANs
+#
+
+# 802.1Q VLAN ID bounds
+VLAN_VID_MIN = 1
+VLAN_VID_MAX = 4094
+
+#
+# Caching
+#
+
+# Change counter bumped whenever prefixes or aggregates change; keys cached reports derived from them
+PREFIX_CACHE_VERSION = "ipam.prefixes"
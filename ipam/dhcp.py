@@ -0,0 +1,169 @@
+import csv
+import io
+import os
+import re
+from collections import namedtuple
+
+import netaddr
+from django.db import transaction
+from django.utils import timezone
+
+from ipam import dns
+from ipam.enums import IPAddressStatusChoices
+from ipam.models import IPAddress, LeaseFile
+from utilities.bulk import chunked
+
+Lease = namedtuple("Lease", ["address", "active", "hostname"])
+
+ISC_LEASE = re.compile(rb"lease\s+([0-9a-fA-F.:]+)\s*\{(.*?)\}", re.DOTALL)
+ISC_STATE = re.compile(rb"^\s*binding state\s+(\w+);", re.MULTILINE)
+ISC_HOSTNAME = re.compile(rb"^\s*client-hostname\s+\"([^\"]*)\";", re.MULTILINE)
+
+# Kea lease states: 0 is a valid lease, 1 declined, 2 expired and reclaimed
+KEA_ACTIVE = "0"
+
+READ_SIZE = 8 * 1024 * 1024
+
+
+def parse_isc(data):
+	"""
+	Parse complete `lease` blocks of an ISC dhcpd lease file.
+
+	Returns (leases, consumed) where consumed is the number of bytes up to the end of the last complete block.
+	"""
+	leases = []
+	consumed = 0
+	for match in ISC_LEASE.finditer(data):
+		body = match.group(2)
+		state = ISC_STATE.search(body)
+		hostname = ISC_HOSTNAME.search(body)
+		leases.append(Lease(
+			match.group(1).decode(),
+			state is not None and state.group(1) == b"active",
+			hostname.group(1).decode(errors="replace") if hostname else "",
+		))
+		consumed = match.end()
+	return leases, consumed
+
+
+def parse_kea(data, header):
+	"""
+	Parse complete lines of a Kea memfile CSV lease file, using the column names of its header line.
+	"""
+	consumed = data.rfind(b"\n") + 1
+	leases = []
+	for row in csv.DictReader(io.StringIO(data[:consumed].decode(errors="replace")), fieldnames=header):
+		if row.get("address") in (None, "address"):
+			continue
+		leases.append(Lease(row["address"], row.get("state", KEA_ACTIVE) == KEA_ACTIVE,
+		                    (row.get("hostname") or "").rstrip(".")))
+	return leases, consumed
+
+
+class LeaseIngester:
+	"""
+	Tail-read a DHCP lease file from the offset saved by the previous run and apply the lease changes in bulk.
+
+	Active leases mark their address as DHCP with the leased hostname, creating the address when it does not exist.
+	Ended leases clear the hostname of DHCP addresses. Rows whose values would not change are left untouched.
+	"""
+
+	def __init__(self, path, vrf=None, domain=None, batch_size=1000):
+		self.path = os.path.abspath(path)
+		self.vrf_id = getattr(vrf, "pk", vrf)
+		self.domain = domain.strip(".").lower() if domain else None
+		self.batch_size = batch_size
+		self.created = 0
+		self.updated = 0
+
+	def hostname(self, lease):
+		name = lease.hostname.lower()
+		if name and self.domain and "." not in name:
+			name = f"{name}.{self.domain}"
+		return name
+
+	def read(self, state):
+		"""
+		Yield lists of leases appended since the saved offset, updating state.offset as records complete.
+		"""
+		stat = os.stat(self.path)
+		if state.inode != stat.st_ino or stat.st_size < state.offset:
+			# Rotated or truncated: start over
+			state.offset = 0
+			state.inode = stat.st_ino
+
+		with open(self.path, "rb") as stream:
+			header = stream.readline()
+			kea = header.startswith(b"address,")
+			columns = header.decode().strip().split(",") if kea else None
+			stream.seek(max(state.offset, len(header) if kea else 0))
+			pending = b""
+			while True:
+				data = stream.read(READ_SIZE)
+				if not data:
+					break
+				pending += data
+				leases, consumed = parse_kea(pending, columns) if kea else parse_isc(pending)
+				state.offset = stream.tell() - len(pending) + consumed
+				pending = pending[consumed:]
+				if leases:
+					yield leases
+
+	def apply(self, leases):
+		# Only the last lease of an address in the batch matters
+		latest = {}
+		for lease in leases:
+			try:
+				network = netaddr.IPAddress(lease.address)
+			except (netaddr.AddrFormatError, ValueError):
+				continue
+			latest[network.version, int(network)] = (str(network), lease)
+
+		now = timezone.now()
+		dhcp = IPAddressStatusChoices.STATUS_DHCP.value
+		for keys in chunked(latest, self.batch_size):
+			existing = {}
+			rows = IPAddress.objects.filter(vrf_id=self.vrf_id, address_int__in=[key[1] for key in keys]).order_by("pk")
+			for obj in rows.only("pk", "address", "family", "address_int", "status", "dns_name"):
+				existing.setdefault((obj.family, obj.address_int), obj)
+
+			to_create = []
+			to_update = []
+			for key in keys:
+				address, lease = latest[key]
+				obj = existing.get(key)
+				if lease.active:
+					hostname = self.hostname(lease)
+					if obj is None:
+						obj = IPAddress(address=address, vrf_id=self.vrf_id, status=dhcp, dns_name=hostname)
+						obj.update_range_fields()
+						to_create.append(obj)
+					elif obj.status != dhcp or obj.dns_name != hostname:
+						obj.status = dhcp
+						obj.dns_name = hostname
+						to_update.append(obj)
+				elif obj is not None and obj.status == dhcp and obj.dns_name:
+					obj.dns_name = ""
+					to_update.append(obj)
+
+			for obj in to_update:
+				obj.last_updated = now
+			with transaction.atomic():
+				IPAddress.objects.bulk_create(to_create)
+				IPAddress.objects.bulk_update(to_update, ["status", "dns_name", "last_updated"])
+				dns.mark_replaced(to_update)
+			self.created += len(to_create)
+			self.updated += len(to_update)
+
+	def run(self):
+		"""
+		Ingest everything appended since the last run and return (created, updated).
+		"""
+		state, _ = LeaseFile.objects.get_or_create(path=self.path)
+		for leases in self.read(state):
+			self.apply(leases)
+			# Save progress after each applied chunk so a crash resumes from here
+			LeaseFile.objects.filter(pk=state.pk).update(offset=state.offset, inode=state.inode,
+			                                            updated_at=timezone.now())
+		LeaseFile.objects.filter(pk=state.pk).update(offset=state.offset, inode=state.inode, updated_at=timezone.now())
+		return self.created, self.updated
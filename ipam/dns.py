@@ -0,0 +1,231 @@
+import os
+import tempfile
+
+import netaddr
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from ipam.models import DNSZone, IPAddress
+
+RECORD_TYPES = {4: "A", 6: "AAAA"}
+# Mode of new zone files, which the nameserver may read as another user
+ZONE_FILE_MODE = 0o644
+# Forward zones written together in one pass over the address table
+FORWARD_ZONES_PER_PASS = 100
+
+
+def forward_zone(dns_name):
+	"""
+	Return the forward zone a name belongs to: the longest configured zone suffix, else its parent domain.
+	"""
+	name = dns_name.rstrip(".").lower()
+	zones = getattr(settings, "DNS_FORWARD_ZONES", [])
+	if zones:
+		matches = [zone for zone in zones if name == zone or name.endswith("." + zone)]
+		return max(matches, key=len) if matches else None
+	return name.partition(".")[2] or None
+
+
+def reverse_zone(family, address):
+	"""
+	Return the in-addr.arpa or ip6.arpa zone holding the PTR record of an address.
+	"""
+	if family == 4:
+		length = settings.DNS_REVERSE_IPV4_PREFIX_LENGTH
+		octets = str(netaddr.IPAddress(address, 4)).split(".")[:length // 8]
+		return ".".join(reversed(octets)) + ".in-addr.arpa"
+	length = settings.DNS_REVERSE_IPV6_PREFIX_LENGTH
+	nibbles = "{:032x}".format(address)[:length // 4]
+	return ".".join(reversed(nibbles)) + ".ip6.arpa"
+
+
+def reverse_zone_range(zone):
+	"""
+	Return (family, first, last) of the addresses covered by a reverse zone name.
+	"""
+	labels = zone[:-len(".in-addr.arpa")].split(".") if zone.endswith(".in-addr.arpa") else None
+	if labels is not None:
+		octets = list(reversed(labels))
+		first = int(netaddr.IPAddress(".".join(octets + ["0"] * (4 - len(octets)))))
+		return 4, first, first + 2 ** (32 - 8 * len(octets)) - 1
+	nibbles = "".join(reversed(zone[:-len(".ip6.arpa")].split(".")))
+	first = int(nibbles.ljust(32, "0"), 16)
+	return 6, first, first + 2 ** (128 - 4 * len(nibbles)) - 1
+
+
+def zones_for(dns_name, family, address):
+	zones = {reverse_zone(family, address)}
+	zone = forward_zone(dns_name)
+	if zone:
+		zones.add(zone)
+	return zones
+
+
+def forward_records(zones):
+	"""
+	Yield (zone, record line) for every record of the given forward zones, reading the address table once for all.
+	"""
+	query = Q(pk__in=[])
+	for zone in zones:
+		query |= Q(dns_name=zone) | Q(dns_name__endswith="." + zone)
+	rows = IPAddress.objects.filter(query).order_by("dns_name", "family", "address_int").values_list(
+		"dns_name", "family", "address_int")
+	for dns_name, family, address in rows.iterator(chunk_size=2000):
+		zone = forward_zone(dns_name)
+		# Names under a more specific configured zone belong to that zone only
+		if zone in zones:
+			yield zone, f"{dns_name.rstrip('.')}. IN {RECORD_TYPES[family]} {netaddr.IPAddress(address, family)}"
+
+
+def zone_records(zone):
+	"""
+	Yield the resource record lines of a zone, streamed from the database in chunks.
+	"""
+	if zone.endswith(".arpa"):
+		family, first, last = reverse_zone_range(zone)
+		rows = IPAddress.objects.filter(family=family, address_int__gte=first, address_int__lte=last).exclude(
+			dns_name="").order_by("address_int", "pk").values_list("address_int", "dns_name")
+		for address, dns_name in rows.iterator(chunk_size=2000):
+			pointer = netaddr.IPAddress(address, family).reverse_dns
+			yield f"{pointer} IN PTR {dns_name.rstrip('.')}."
+	else:
+		for _, record in forward_records({zone}):
+			yield record
+
+
+class ZoneFile:
+	"""
+	A zone file rendered into a temporary file next to it and renamed over the old one on commit.
+	"""
+
+	def __init__(self, zone, serial, directory):
+		self.path = os.path.join(directory, f"{zone}.zone")
+		descriptor, self.temporary = tempfile.mkstemp(dir=directory, prefix=f".{zone}.", suffix=".tmp")
+		self.stream = os.fdopen(descriptor, "w")
+		self.count = 0
+		self.done = False
+		self.stream.write(f"$ORIGIN {zone}.\n$TTL {settings.DNS_ZONE_TTL}\n")
+		self.stream.write(f"@ IN SOA {settings.DNS_ZONE_NAMESERVER} {settings.DNS_ZONE_HOSTMASTER} "
+		                  f"({serial} 3600 600 604800 {settings.DNS_ZONE_TTL})\n")
+		self.stream.write(f"@ IN NS {settings.DNS_ZONE_NAMESERVER}\n")
+
+	def write(self, record):
+		self.stream.write(record + "\n")
+		self.count += 1
+
+	def commit(self):
+		self.stream.close()
+		# mkstemp creates files only their owner can read, and the rename keeps that mode
+		try:
+			mode = os.stat(self.path).st_mode & 0o777
+		except FileNotFoundError:
+			mode = ZONE_FILE_MODE
+		os.chmod(self.temporary, mode)
+		os.replace(self.temporary, self.path)
+		self.done = True
+
+	def abort(self):
+		if not self.done:
+			self.stream.close()
+			os.unlink(self.temporary)
+			self.done = True
+
+
+def write_zone(zone, serial, directory):
+	"""
+	Write a zone file atomically: render into a temporary file next to it, then rename over the old one.
+	"""
+	os.makedirs(directory, exist_ok=True)
+	zone_file = ZoneFile(zone, serial, directory)
+	try:
+		for record in zone_records(zone):
+			zone_file.write(record)
+		zone_file.commit()
+	finally:
+		zone_file.abort()
+	return zone_file.count
+
+
+def write_zones(serials, directory):
+	"""
+	Write every zone of {zone: serial} and return {zone: record_count}.
+
+	Reverse zones are read by address range one at a time; forward zones can only be matched by name suffix, so they
+	are written in groups from a single pass over the address table each.
+	"""
+	os.makedirs(directory, exist_ok=True)
+	counts = {}
+	forward = []
+	for zone in sorted(serials):
+		if zone.endswith(".arpa"):
+			counts[zone] = write_zone(zone, serials[zone], directory)
+		else:
+			forward.append(zone)
+	for i in range(0, len(forward), FORWARD_ZONES_PER_PASS):
+		files = {}
+		try:
+			for zone in forward[i:i + FORWARD_ZONES_PER_PASS]:
+				files[zone] = ZoneFile(zone, serials[zone], directory)
+			for zone, record in forward_records(files):
+				files[zone].write(record)
+			for zone, zone_file in files.items():
+				zone_file.commit()
+				counts[zone] = zone_file.count
+		finally:
+			for zone_file in files.values():
+				zone_file.abort()
+	return counts
+
+
+def changed_zones(since):
+	"""
+	Return the zones touched by addresses updated since the watermark (every zone when there is none).
+	"""
+	rows = IPAddress.objects.exclude(dns_name="")
+	if since is not None:
+		rows = rows.filter(last_updated__gte=since)
+	zones = set()
+	for dns_name, family, address in rows.values_list("dns_name", "family", "address_int").iterator(chunk_size=5000):
+		zones.update(zones_for(dns_name, family, address))
+	return zones
+
+
+def generate(full=False, directory=None):
+	"""
+	Rewrite the zones changed since the last run and return {zone: record_count}.
+	"""
+	directory = str(directory or settings.DNS_ZONE_DIR)
+	started = timezone.now()
+	since = None if full else DNSZone.objects.aggregate(since=Max("generated_at"))["since"]
+	zones = changed_zones(since)
+	zones.update(DNSZone.objects.filter(dirty=True).values_list("name", flat=True))
+
+	serials = {}
+	for name in sorted(zones):
+		zone, _ = DNSZone.objects.get_or_create(name=name)
+		serials[name] = max(zone.serial + 1, int(started.timestamp()))
+	written = write_zones(serials, directory)
+	for name, count in written.items():
+		DNSZone.objects.filter(name=name).update(serial=serials[name], record_count=count, generated_at=started,
+		                                         dirty=False)
+	return written
+
+
+def mark_dirty(zones):
+	DNSZone.objects.filter(name__in=zones).update(dirty=True)
+
+
+def mark_replaced(objs):
+	"""
+	Mark dirty the zones of the records bulk-updated addresses held when loaded and hold now.
+
+	bulk_update sends no signals, and changed_zones cannot see a record that was cleared or renamed away.
+	"""
+	zones = set()
+	for obj in objs:
+		for scope in (getattr(obj, "_loaded_dns", None), obj.dns_scope):
+			if scope:
+				zones.update(zones_for(*scope))
+	if zones:
+		mark_dirty(zones)
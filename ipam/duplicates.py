@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+import netaddr
+from django.conf import settings
+from django.db.models import Count, Q
+
+from ipam.models import IPAddress, VRF
+from ipam.utils import address_value
+from utilities.bulk import chunked
+
+Duplicate = namedtuple("Duplicate", ["vrf_id", "family", "address_int", "ids", "addresses"])
+
+
+def enforcing_filter(include_global=True):
+	"""
+	Return a Q selecting addresses in VRFs that enforce uniqueness, plus the global table.
+	"""
+	query = Q(vrf__enforce_unique=True)
+	if include_global:
+		query |= Q(vrf__isnull=True)
+	return query
+
+
+def find_duplicates(queryset=None, include_global=True, batch_size=1000):
+	"""
+	Yield a Duplicate for every address held more than once within an enforcing VRF or the global table.
+
+	One GROUP BY query finds the duplicated keys, then their rows are fetched in batches.
+	"""
+	if queryset is None:
+		queryset = IPAddress.objects.all()
+	queryset = queryset.filter(enforcing_filter(include_global))
+	keys = queryset.order_by().values("vrf_id", "family", "address_int").annotate(count=Count("pk")).filter(
+		count__gt=1).values_list("vrf_id", "family", "address_int")
+
+	for batch in chunked(keys.iterator(), batch_size):
+		groups = {key: ([], []) for key in batch}
+		rows = queryset.filter(address_int__in=set(key[2] for key in batch)).order_by("pk").values_list(
+			"pk", "vrf_id", "family", "address_int", "address")
+		for pk, vrf_id, family, number, address in rows:
+			group = groups.get((vrf_id, family, number))
+			if group is not None:
+				group[0].append(pk)
+				group[1].append(address)
+		for (vrf_id, family, number), (ids, addresses) in groups.items():
+			yield Duplicate(vrf_id, family, number, ids, addresses)
+
+
+def find_duplicate_records(records, batch_size=1000):
+	"""
+	Pre-import check: yield (line, message) for every record that would duplicate an address in an enforcing scope.
+
+	Records are (line_number, {"address": ..., "vrf": name or id}) pairs, as produced by utilities.bulk.read_records.
+	A VRF that does not exist is reported for its line rather than checked against the global table.
+	"""
+	names, ids = {}, {}
+	for pk, name, enforce in VRF.objects.values_list("pk", "name", "enforce_unique"):
+		# Keep the first match when a name is not unique, as the importers do
+		names.setdefault(name, (pk, enforce))
+		ids[pk] = (pk, enforce)
+	enforce_global = getattr(settings, "ENFORCE_GLOBAL_UNIQUE", False)
+	seen = {}
+
+	for batch in chunked(records, batch_size):
+		keyed = []
+		for line, record in batch:
+			if not isinstance(record, dict):
+				continue
+			vrf = record.get("vrf")
+			if vrf in (None, ""):
+				vrf_id, enforce = None, enforce_global
+			else:
+				scope = names.get(vrf)
+				if scope is None and str(vrf).isdigit():
+					scope = ids.get(int(vrf))
+				if scope is None:
+					yield line, f"Unknown VRF '{vrf}'"
+					continue
+				vrf_id, enforce = scope
+			if not enforce:
+				continue
+			try:
+				family, number = address_value(record.get("address"))
+			except (netaddr.AddrFormatError, ValueError, TypeError):
+				continue
+			key = (vrf_id, family, number)
+			if key in seen:
+				yield line, f"{record.get('address')} duplicates line {seen[key]}"
+				continue
+			seen[key] = line
+			keyed.append((line, key, record.get("address")))
+
+		existing = set(IPAddress.objects.filter(address_int__in=set(key[2] for _, key, _ in keyed)).values_list(
+			"vrf_id", "family", "address_int"))
+		for line, key, address in keyed:
+			if key in existing:
+				yield line, f"{address} already exists"
@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class IPIntegerField(models.CharField):
+	"""
+	Stores an IPv4 or IPv6 integer as a fixed-width hexadecimal string so that 128-bit values keep their numeric
+	ordering on every database backend.
+	"""
+	WIDTH = 32
+
+	def __init__(self, *args, **kwargs):
+		kwargs["max_length"] = self.WIDTH
+		super().__init__(*args, **kwargs)
+
+	def deconstruct(self):
+		name, path, args, kwargs = super().deconstruct()
+		del kwargs["max_length"]
+		return name, path, args, kwargs
+
+	def from_db_value(self, value, expression, connection):
+		if value is None:
+			return value
+		return int(value, 16)
+
+	def to_python(self, value):
+		if value is None or isinstance(value, int):
+			return value
+		return int(value, 16)
+
+	def get_prep_value(self, value):
+		if value is None or value == "":
+			return None
+		if isinstance(value, str):
+			value = int(value, 16)
+		return format(int(value), "0{}x".format(self.WIDTH))
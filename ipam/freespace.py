@@ -0,0 +1,46 @@
+import netaddr
+
+from ipam.allocators import free_ranges, range_to_cidrs
+from ipam.constants import PREFIX_CACHE_VERSION
+from ipam.lookup import FAMILY_BITS
+from ipam.models import Aggregate, Prefix
+from utilities.cache import cached
+
+
+def free_blocks(aggregate):
+	"""
+	Yield the free CIDR blocks of an aggregate, as netaddr.IPNetwork, by merging its sorted child prefixes.
+	"""
+	used = Prefix.objects.contained_by(aggregate.prefix).order_by("network_start").values_list(
+		"network_start", "network_end")
+	bits = FAMILY_BITS[aggregate.family]
+	for start, end in free_ranges(aggregate.network_start, aggregate.network_end, used.iterator(chunk_size=10000)):
+		for network, length in range_to_cidrs(start, end, bits):
+			yield netaddr.IPNetwork((network, length), aggregate.family)
+
+
+def aggregate_report(aggregate):
+	"""
+	Return the allocated/free summary and free blocks of an aggregate, cached until prefixes or aggregates change.
+	"""
+
+	def compute():
+		blocks = list(free_blocks(aggregate))
+		free = sum(block.size for block in blocks)
+		size = aggregate.network_end - aggregate.network_start + 1
+		return {
+			"id": aggregate.pk,
+			"prefix": aggregate.prefix,
+			"rir": aggregate.rir_id,
+			"size": size,
+			"allocated": size - free,
+			"free": free,
+			"free_blocks": [str(block) for block in blocks],
+		}
+
+	return cached(PREFIX_CACHE_VERSION, f"free:{aggregate.pk}:{aggregate.prefix}", compute)
+
+
+def rir_report(rir):
+	return [aggregate_report(aggregate) for aggregate in Aggregate.objects.filter(rir=rir).order_by(
+		"family", "network_start")]
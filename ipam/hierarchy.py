@@ -0,0 +1,126 @@
+from django.db import transaction
+
+HIERARCHY_FIELDS = ["parent", "depth", "child_count", "descendant_count"]
+
+
+def annotate(rows):
+	"""
+	Compute the hierarchy of a set of prefixes in a single stack-based sweep.
+
+	`rows` is an iterable of (pk, family, start, end, prefix_length) tuples sorted by (family, start, prefix_length).
+	Returns a dict mapping pk to (parent_pk, depth, child_count, descendant_count).
+	"""
+	result = {}
+	children = {}
+	descendants = {}
+	stack = []
+	family = None
+
+	def close(pk):
+		parent = result[pk][0]
+		if parent is not None:
+			descendants[parent] += descendants[pk] + 1
+
+	for pk, row_family, start, end, _ in rows:
+		if row_family != family:
+			while stack:
+				close(stack.pop()[0])
+			family = row_family
+		# Pop every prefix that ends before this one; identical prefixes are siblings, not ancestors
+		while stack and (stack[-1][2] < end or (stack[-1][1] == start and stack[-1][2] == end)):
+			close(stack.pop()[0])
+		parent = stack[-1][0] if stack else None
+		result[pk] = (parent, len(stack))
+		children[pk] = 0
+		descendants[pk] = 0
+		if parent is not None:
+			children[parent] += 1
+		stack.append((pk, start, end))
+	while stack:
+		close(stack.pop()[0])
+
+	return {pk: (parent, depth, children[pk], descendants[pk]) for pk, (parent, depth) in result.items()}
+
+
+def sweep(queryset, parent=None, depth=0, batch_size=1000):
+	"""
+	Recompute and store the hierarchy columns of the prefixes in a queryset, writing back only changed rows.
+
+	Rows at the top of the set get `parent` and depths start at `depth`, so a subtree can be swept in place.
+	Returns (hierarchy, number of updated rows).
+	"""
+	from ipam.models import Prefix
+
+	rows = list(queryset.order_by("family", "network_start", "prefix_length", "pk").values_list(
+		"pk", "family", "network_start", "network_end", "prefix_length", "parent_id", "depth", "child_count",
+		"descendant_count"
+	))
+	hierarchy = {}
+	for pk, (row_parent, row_depth, children, descendants) in annotate(row[:5] for row in rows).items():
+		hierarchy[pk] = (parent if row_parent is None else row_parent, depth + row_depth, children, descendants)
+
+	changed = []
+	for row in rows:
+		values = hierarchy[row[0]]
+		if tuple(row[5:]) != values:
+			changed.append(Prefix(pk=row[0], parent_id=values[0], depth=values[1], child_count=values[2],
+			                      descendant_count=values[3]))
+	with transaction.atomic():
+		for i in range(0, len(changed), batch_size):
+			Prefix.objects.bulk_update(changed[i:i + batch_size], HIERARCHY_FIELDS)
+	return hierarchy, len(changed)
+
+
+def rebuild(vrf_id=None, family=None, start=None, end=None, batch_size=1000):
+	"""
+	Recompute and store the hierarchy columns of a VRF (None for the global table).
+
+	When family, start and end describe a top-level prefix only that subtree is swept. Returns the number of
+	updated rows.
+	"""
+	from ipam.models import Prefix
+
+	queryset = Prefix.objects.filter(vrf_id=vrf_id)
+	if family is not None:
+		queryset = queryset.filter(family=family, network_start__gte=start, network_end__lte=end)
+	return sweep(queryset, batch_size=batch_size)[1]
+
+
+def rebuild_scope(vrf_id, family, start, end):
+	"""
+	Recompute the hierarchy around a prefix added to or removed from a range.
+
+	Only the prefixes inside the range can change parent or depth, so only they are swept, hung under the nearest
+	prefix strictly enclosing the range. The child counts of the parents they left are recounted, as are the counts
+	of that prefix and its chain of ancestors.
+	"""
+	from ipam.models import Prefix
+
+	scope = Prefix.objects.filter(vrf_id=vrf_id, family=family)
+	affected = scope.filter(network_start__gte=start, network_end__lte=end)
+	# Among identical prefixes the one with the highest pk holds the children, as in annotate()
+	enclosing = scope.filter(network_start__lte=start, network_end__gte=end).exclude(
+		network_start=start, network_end=end).order_by("-prefix_length", "-pk").values_list(
+		"pk", "parent_id", "depth").first()
+	pk, parent, depth = enclosing or (None, None, -1)
+
+	with transaction.atomic():
+		parents = set(affected.exclude(parent=None).values_list("parent_id", flat=True))
+		hierarchy, changed = sweep(affected, pk, depth + 1)
+		for parent_pk in parents.difference(hierarchy):
+			Prefix.objects.filter(pk=parent_pk).update(child_count=Prefix.objects.filter(parent_id=parent_pk).count())
+		if pk is None:
+			return changed
+
+		chain = {pk: None}
+		ancestors = dict(scope.filter(network_start__lte=start, network_end__gte=end).values_list("pk", "parent_id"))
+		while parent in ancestors:
+			chain[parent] = None
+			parent = ancestors[parent]
+		for ancestor, outer_start, outer_end in scope.filter(pk__in=chain).values_list(
+				"pk", "network_start", "network_end"):
+			descendants = scope.filter(network_start__gte=outer_start, network_end__lte=outer_end).exclude(
+				network_start=outer_start, network_end=outer_end).count()
+			Prefix.objects.filter(pk=ancestor).update(
+				child_count=Prefix.objects.filter(parent_id=ancestor).count(), descendant_count=descendants)
+	return changed
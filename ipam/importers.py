@@ -0,0 +1,286 @@
+import netaddr
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from ipam import dns, hierarchy
+from ipam.constants import PREFIX_CACHE_VERSION
+from ipam.enums import IPAddressStatusChoices, PrefixStatusChoices
+from ipam.lookup import prefix_lookup
+from ipam.models import Aggregate, IPAddress, Prefix, RIR, VLAN, VRF
+from utilities.bulk import RowError, chunked, clean_status, read_records
+from utilities.cache import bump_version
+
+TRUE_VALUES = ("1", "true", "yes", "y", "on")
+
+
+class NameCache:
+	"""
+	Resolve names to primary keys, fetching the misses of a whole batch with one query.
+	"""
+
+	def __init__(self, model, field="name"):
+		self.model = model
+		self.field = field
+		self.cache = {}
+
+	def prefetch(self, names):
+		missing = set(name for name in names if name and name not in self.cache)
+		if not missing:
+			return
+		for pk, name in self.model.objects.filter(**{f"{self.field}__in": missing}).values_list("pk", self.field):
+			# Keep the first match when a name is not unique
+			self.cache.setdefault(name, pk)
+		for name in missing:
+			self.cache.setdefault(name, None)
+
+	def get(self, name, required=False):
+		if not name:
+			if required:
+				raise ValidationError(f"{self.model._meta.verbose_name} is required")
+			return None
+		pk = self.cache.get(name)
+		if pk is None:
+			raise ValidationError(f"Unknown {self.model._meta.verbose_name} '{name}'")
+		return pk
+
+
+def clean_network(value):
+	try:
+		return netaddr.IPNetwork(str(value).strip())
+	except (netaddr.AddrFormatError, ValueError, TypeError):
+		raise ValidationError(f"Invalid prefix or address '{value}'")
+
+
+class BaseImporter:
+	model = None
+	# Record columns resolved through a NameCache, mapped to the cache attribute
+	references = {}
+	update_fields = []
+	# Fields build() checks itself: statuses through clean_status, which accepts stored values rather than the choice
+	# names the models declare, and CIDR prefixes through clean_network
+	checked_fields = ["status"]
+
+	def __init__(self, batch_size=1000, update=False, on_error=None):
+		self.batch_size = batch_size
+		self.update = update
+		self.on_error = on_error
+		self.caches = {
+			"vrf": NameCache(VRF),
+			"vlan": NameCache(VLAN),
+			"rir": NameCache(RIR),
+		}
+		self.created = 0
+		self.updated = 0
+		self.failed = 0
+		self.touched_vrfs = set()
+
+	def error(self, line, message):
+		self.failed += 1
+		if self.on_error:
+			self.on_error(RowError(line, message))
+
+	def build(self, record):
+		raise NotImplementedError
+
+	def validate(self, obj):
+		"""
+		Check lengths, blanks and choices so a bad row is reported instead of failing the whole batch insert.
+		"""
+		# References come from the caches and non-editable fields are derived from the prefix or address
+		exclude = [field.name for field in self.model._meta.local_fields if field.many_to_one or not field.editable]
+		try:
+			obj.clean_fields(exclude=exclude + self.checked_fields)
+		except ValidationError as e:
+			raise ValidationError([f"{field}: {message}" for field, messages in e.message_dict.items()
+			                       for message in messages])
+
+	def key(self, obj):
+		raise NotImplementedError
+
+	def existing(self, objs):
+		"""
+		Return {key: pk} for rows already in the database matching the batch.
+		"""
+		raise NotImplementedError
+
+	def import_records(self, records):
+		"""
+		Import an iterable of (line_number, record) pairs, returning (created, updated, failed) counts.
+		"""
+		for batch in chunked(records, self.batch_size):
+			self.import_batch(batch)
+		self.finish()
+		return self.created, self.updated, self.failed
+
+	def import_file(self, source, format=None):
+		return self.import_records(read_records(source, format))
+
+	def import_batch(self, batch):
+		for column, cache in self.references.items():
+			self.caches[cache].prefetch(
+				(record.get(column) or "").strip() for _, record in batch if isinstance(record, dict))
+
+		objs = {}
+		for line, record in batch:
+			if not isinstance(record, dict):
+				self.error(line, f"Malformed record: {record}")
+				continue
+			try:
+				obj = self.build({k: v.strip() if isinstance(v, str) else v for k, v in record.items()})
+				self.validate(obj)
+			except ValidationError as e:
+				self.error(line, "; ".join(e.messages))
+				continue
+			key = self.key(obj)
+			if key in objs:
+				self.error(line, f"Duplicate of line {objs[key][0]}")
+				continue
+			objs[key] = (line, obj)
+
+		if not objs:
+			return
+		existing = self.existing([obj for _, obj in objs.values()])
+		to_create = []
+		to_update = []
+		for key, (line, obj) in objs.items():
+			if key not in existing:
+				to_create.append(obj)
+			elif self.update:
+				obj.pk = existing[key]
+				to_update.append(obj)
+			else:
+				self.error(line, f"{obj} already exists")
+
+		with transaction.atomic():
+			self.model.objects.bulk_create(to_create)
+			if to_update:
+				self.model.objects.bulk_update(to_update, self.update_fields)
+			self.written(to_create, to_update)
+		self.created += len(to_create)
+		self.updated += len(to_update)
+
+	def written(self, created, updated):
+		"""
+		Called inside the batch transaction after the rows are written; bulk writes send no signals.
+		"""
+
+	def finish(self):
+		pass
+
+
+class PrefixImporter(BaseImporter):
+	model = Prefix
+	references = {"vrf": "vrf", "vlan": "vlan"}
+	update_fields = ["vlan", "status", "is_pool", "description"]
+	checked_fields = ["status", "prefix"]
+
+	def build(self, record):
+		network = clean_network(record.get("prefix"))
+		obj = Prefix(
+			prefix=str(network.cidr),
+			vrf_id=self.caches["vrf"].get(record.get("vrf")),
+			vlan_id=self.caches["vlan"].get(record.get("vlan")),
+			is_pool=str(record.get("is_pool", "")).lower() in TRUE_VALUES,
+			description=record.get("description") or "",
+		)
+		obj.status = clean_status(record.get("status"), PrefixStatusChoices) or obj.status
+		obj.update_range_fields()
+		self.touched_vrfs.add(obj.vrf_id)
+		return obj
+
+	def key(self, obj):
+		return obj.vrf_id, obj.family, obj.network_start, obj.prefix_length
+
+	def existing(self, objs):
+		rows = Prefix.objects.filter(network_start__in=set(obj.network_start for obj in objs)).values_list(
+			"pk", "vrf_id", "family", "network_start", "prefix_length")
+		found = {}
+		for pk, vrf_id, family, start, length in rows:
+			found.setdefault((vrf_id, family, start, length), pk)
+		return found
+
+	def finish(self):
+		# bulk_create bypasses the signal handlers, so refresh the derived structures once at the end
+		for vrf_id in self.touched_vrfs:
+			hierarchy.rebuild(vrf_id)
+		if self.touched_vrfs:
+			prefix_lookup.reset()
+			bump_version(PREFIX_CACHE_VERSION)
+
+
+class IPAddressImporter(BaseImporter):
+	model = IPAddress
+	references = {"vrf": "vrf"}
+	update_fields = ["address", "prefix_length", "status", "dns_name", "description", "last_updated"]
+
+	def build(self, record):
+		network = clean_network(record.get("address"))
+		obj = IPAddress(
+			address=str(network.ip),
+			vrf_id=self.caches["vrf"].get(record.get("vrf")),
+			dns_name=(record.get("dns_name") or "").lower(),
+			description=record.get("description") or "",
+			# bulk_update skips auto_now, and DNS zone generation relies on it
+			last_updated=timezone.now(),
+		)
+		obj.status = clean_status(record.get("status"), IPAddressStatusChoices) or obj.status
+		obj.prefix_length = network.prefixlen
+		obj.update_range_fields()
+		return obj
+
+	def key(self, obj):
+		return obj.vrf_id, obj.family, obj.address_int
+
+	def existing(self, objs):
+		values = set(obj.address_int for obj in objs)
+		rows = IPAddress.objects.filter(address_int__in=values).values_list("pk", "vrf_id", "family", "address_int",
+		                                                                    "dns_name")
+		found = {}
+		loaded = {}
+		for pk, vrf_id, family, address, dns_name in rows:
+			found.setdefault((vrf_id, family, address), pk)
+			loaded.setdefault((vrf_id, family, address), (dns_name, family, address) if dns_name else None)
+		# Remember the record each updated row held, so its old zones can be regenerated
+		for obj in objs:
+			obj._loaded_dns = loaded.get(self.key(obj))
+		return found
+
+	def written(self, created, updated):
+		dns.mark_replaced(updated)
+
+
+class AggregateImporter(BaseImporter):
+	model = Aggregate
+	references = {"rir": "rir"}
+	update_fields = ["rir", "description"]
+	checked_fields = ["prefix"]
+
+	def build(self, record):
+		network = clean_network(record.get("prefix"))
+		obj = Aggregate(
+			prefix=str(network.cidr),
+			rir_id=self.caches["rir"].get(record.get("rir"), required=True),
+			description=record.get("description") or "",
+		)
+		obj.update_range_fields()
+		return obj
+
+	def key(self, obj):
+		return obj.family, obj.network_start, obj.prefix_length
+
+	def existing(self, objs):
+		rows = Aggregate.objects.filter(network_start__in=set(obj.network_start for obj in objs)).values_list(
+			"pk", "family", "network_start", "prefix_length")
+		return {(family, start, length): pk for pk, family, start, length in rows}
+
+	def finish(self):
+		if self.created or self.updated:
+			bump_version(PREFIX_CACHE_VERSION)
+
+
+IMPORTERS = {
+	"prefix": PrefixImporter,
+	"ipaddress": IPAddressImporter,
+	"aggregate": AggregateImporter,
+}
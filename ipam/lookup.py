@@ -0,0 +1,218 @@
+import socket
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from ipam.constants import PREFIX_CACHE_VERSION
+from utilities.cache import get_version
+
+PrefixMatch = namedtuple("PrefixMatch", ["prefix_id", "prefix", "vrf_id", "vlan_id"])
+
+FAMILY_BITS = {4: 32, 6: 128}
+
+
+def parse_address(value):
+	"""
+	Return (family, integer) for an address string or an already parsed (family, integer) pair.
+	"""
+	if isinstance(value, tuple):
+		return value
+	try:
+		return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, value), "big")
+	except OSError:
+		return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, value), "big")
+
+
+class PrefixTrie:
+	"""
+	Binary trie over one address family, stored in flat arrays indexed by node number.
+
+	Node 0 is the root, so a child index of 0 means "no child". Each node holds the pk of the prefix ending there or -1.
+	"""
+
+	def __init__(self, bits):
+		self.bits = bits
+		self.left = array("l", [0])
+		self.right = array("l", [0])
+		self.values = array("l", [-1])
+
+	def __len__(self):
+		return len(self.values)
+
+	def _node(self, start, length, create=False):
+		node = 0
+		for shift in range(self.bits - 1, self.bits - length - 1, -1):
+			branch = self.right if (start >> shift) & 1 else self.left
+			child = branch[node]
+			if not child:
+				if not create:
+					return None
+				child = len(self.values)
+				self.left.append(0)
+				self.right.append(0)
+				self.values.append(-1)
+				branch[node] = child
+			node = child
+		return node
+
+	def insert(self, start, length, value):
+		self.values[self._node(start, length, create=True)] = value
+
+	def remove(self, start, length):
+		node = self._node(start, length)
+		if node is not None:
+			self.values[node] = -1
+
+	def lookup(self, address):
+		"""
+		Return the value of the longest prefix containing the address, or -1.
+		"""
+		left, right, values = self.left, self.right, self.values
+		best = values[0]
+		node = 0
+		for shift in range(self.bits - 1, -1, -1):
+			node = right[node] if (address >> shift) & 1 else left[node]
+			if not node:
+				break
+			if values[node] >= 0:
+				best = values[node]
+		return best
+
+
+class PrefixLookup:
+	"""
+	Longest-prefix-match resolution of addresses to prefixes, one trie per VRF and family.
+
+	Tries are built lazily from the Prefix table on first use. Saves in this process are applied by the Prefix signal
+	handlers, which then acknowledge the version they bumped; changes made elsewhere (other workers, bulk imports) are
+	detected through the shared prefix cache version, checked at most every VERSION_CHECK_INTERVAL seconds, and drop
+	every loaded trie.
+	"""
+
+	VERSION_CHECK_INTERVAL = 1.0
+
+	def __init__(self):
+		self._lock = threading.RLock()
+		self._version = None
+		self._checked_at = 0
+		self.reset()
+
+	def _check_version(self):
+		now = time.monotonic()
+		if now - self._checked_at < self.VERSION_CHECK_INTERVAL:
+			return
+		self._checked_at = now
+		version = get_version(PREFIX_CACHE_VERSION)
+		if version != self._version:
+			with self._lock:
+				self.reset()
+				self._version = version
+
+	def acknowledge(self, version):
+		"""
+		Accept a version this process bumped after applying its own change, unless another change came in between.
+		"""
+		with self._lock:
+			if self._version is not None and version == self._version + 1:
+				self._version = version
+
+	def reset(self):
+		with self._lock:
+			self._tries = {}
+			self._records = {}
+			# pk -> (vrf_id, family, start, length), and the pk each such network currently resolves to
+			self._keys = {}
+			self._owners = {}
+			# Extra pks sharing an owned network, promoted when the owner goes away
+			self._shadowed = {}
+
+	def _add(self, tries, record, key):
+		vrf_id, family, start, length = key
+		self._records[record.prefix_id] = record
+		self._keys[record.prefix_id] = key
+		owner = self._owners.get(key)
+		if owner is None or record.prefix_id < owner:
+			if owner is not None:
+				self._shadowed.setdefault(key, set()).add(owner)
+			self._owners[key] = record.prefix_id
+			tries[family].insert(start, length, record.prefix_id)
+		else:
+			self._shadowed.setdefault(key, set()).add(record.prefix_id)
+
+	def _load(self, vrf_id):
+		from ipam.models import Prefix
+
+		tries = {family: PrefixTrie(bits) for family, bits in FAMILY_BITS.items()}
+		rows = Prefix.objects.filter(vrf_id=vrf_id).values_list(
+			"pk", "prefix", "vlan_id", "family", "prefix_length", "network_start")
+		for pk, prefix, vlan_id, family, length, start in rows.iterator():
+			self._add(tries, PrefixMatch(pk, prefix, vrf_id, vlan_id), (vrf_id, family, start, length))
+		return tries
+
+	def _get_tries(self, vrf_id):
+		self._check_version()
+		tries = self._tries.get(vrf_id)
+		if tries is None:
+			with self._lock:
+				tries = self._tries.get(vrf_id)
+				if tries is None:
+					tries = self._tries[vrf_id] = self._load(vrf_id)
+		return tries
+
+	def lookup(self, address, vrf_id=None):
+		"""
+		Return the PrefixMatch of the most specific prefix containing the address in the VRF, or None.
+		"""
+		family, value = parse_address(address)
+		pk = self._get_tries(vrf_id)[family].lookup(value)
+		return self._records.get(pk)
+
+	def lookup_many(self, addresses, vrf_id=None):
+		"""
+		Return a list of PrefixMatch (or None) for each address, in order.
+		"""
+		tries = self._get_tries(vrf_id)
+		records = self._records
+		results = []
+		for address in addresses:
+			family, value = parse_address(address)
+			results.append(records.get(tries[family].lookup(value)))
+		return results
+
+	def discard(self, pk):
+		"""
+		Drop a prefix from the loaded tries.
+		"""
+		with self._lock:
+			key = self._keys.pop(pk, None)
+			self._records.pop(pk, None)
+			if key is None:
+				return
+			vrf_id, family, start, length = key
+			if self._owners.get(key) != pk:
+				self._shadowed.get(key, set()).discard(pk)
+				return
+			shadowed = self._shadowed.get(key)
+			if shadowed:
+				owner = min(shadowed)
+				shadowed.discard(owner)
+				self._owners[key] = owner
+				self._tries[vrf_id][family].insert(start, length, owner)
+			else:
+				del self._owners[key]
+				self._tries[vrf_id][family].remove(start, length)
+
+	def update(self, prefix):
+		"""
+		Apply a saved prefix to the trie of its VRF, if that trie has been loaded.
+		"""
+		with self._lock:
+			self.discard(prefix.pk)
+			tries = self._tries.get(prefix.vrf_id)
+			if tries is not None:
+				key = (prefix.vrf_id, prefix.family, prefix.network_start, prefix.prefix_length)
+				self._add(tries, PrefixMatch(prefix.pk, prefix.prefix, prefix.vrf_id, prefix.vlan_id), key)
+
+
+prefix_lookup = PrefixLookup()
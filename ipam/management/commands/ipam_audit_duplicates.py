@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from ipam.duplicates import find_duplicate_records, find_duplicates
+from ipam.models import VRF
+from utilities.bulk import read_records
+
+
+class Command(BaseCommand):
+	help = "Report duplicate IP addresses in VRFs enforcing uniqueness and in the global table"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--file", help="Check a CSV or JSON Lines import file against the database instead")
+		parser.add_argument("--format", choices=["csv", "jsonl"], help="Override the detected file format")
+
+	def handle(self, *args, **options):
+		count = 0
+		if options["file"]:
+			for line, message in find_duplicate_records(read_records(options["file"], options["format"])):
+				self.stdout.write(f"line {line}: {message}")
+				count += 1
+		else:
+			names = dict(VRF.objects.values_list("pk", "name"))
+			for duplicate in find_duplicates():
+				scope = names.get(duplicate.vrf_id, "global")
+				ids = ", ".join(str(pk) for pk in duplicate.ids)
+				self.stdout.write(f"{scope}: {duplicate.addresses[0]} held by {ids}")
+				count += 1
+		self.stdout.write(f"{count} {'problems' if options['file'] else 'duplicates'} found")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from ipam import freespace
+from ipam.models import Aggregate
+
+
+class Command(BaseCommand):
+	help = "Report the allocated and free space of every aggregate"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--rir", action="append", help="Only report aggregates of the named RIR(s)")
+		parser.add_argument("--blocks", action="store_true", help="List the free CIDR blocks")
+
+	def handle(self, *args, **options):
+		aggregates = Aggregate.objects.select_related("rir").order_by("rir__name", "family", "network_start")
+		if options["rir"]:
+			aggregates = aggregates.filter(rir__name__in=options["rir"])
+		for aggregate in aggregates:
+			report = freespace.aggregate_report(aggregate)
+			self.stdout.write(f"{aggregate.rir} {aggregate.prefix}: {report['allocated']} allocated, "
+			                  f"{report['free']} free in {len(report['free_blocks'])} blocks")
+			if options["blocks"]:
+				for block in report["free_blocks"]:
+					self.stdout.write(f"  {block}")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ipam import dns
+
+
+class Command(BaseCommand):
+	help = "Write forward and reverse DNS zone files for addresses changed since the last run"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--full", action="store_true", help="Regenerate every zone")
+		parser.add_argument("--directory", help="Output directory (defaults to DNS_ZONE_DIR)")
+
+	def handle(self, *args, **options):
+		written = dns.generate(full=options["full"], directory=options["directory"])
+		for zone, count in sorted(written.items()):
+			self.stdout.write(f"{zone}: {count} records")
+		self.stdout.write(f"{len(written)} zones written")
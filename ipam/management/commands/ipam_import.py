@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ipam.importers import IMPORTERS
+
+
+class Command(BaseCommand):
+	help = "Stream prefixes, IP addresses or aggregates from a CSV or JSON Lines file into the database"
+
+	def add_arguments(self, parser):
+		parser.add_argument("model", choices=sorted(IMPORTERS), help="Kind of object in the file")
+		parser.add_argument("path", help="CSV or JSON Lines file; the format follows the extension")
+		parser.add_argument("--format", choices=["csv", "jsonl"], help="Override the detected file format")
+		parser.add_argument("--batch-size", type=int, default=1000, help="Rows written per transaction")
+		parser.add_argument("--update", action="store_true", help="Update rows that already exist")
+
+	def handle(self, *args, **options):
+		def report(error):
+			self.stderr.write(f"line {error.line}: {error.message}")
+
+		importer = IMPORTERS[options["model"]](batch_size=options["batch_size"], update=options["update"],
+		                                       on_error=report)
+		try:
+			created, updated, failed = importer.import_file(options["path"], options["format"])
+		except OSError as e:
+			raise CommandError(e)
+		self.stdout.write(f"{created} created, {updated} updated, {failed} failed")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ipam.dhcp import LeaseIngester
+from ipam.models import VRF
+
+
+class Command(BaseCommand):
+	help = "Apply new entries of ISC dhcpd or Kea lease files to IP address status and DNS names"
+
+	def add_arguments(self, parser):
+		parser.add_argument("paths", nargs="+", help="Lease files to read")
+		parser.add_argument("--vrf", help="VRF the leased addresses belong to (defaults to the global table)")
+		parser.add_argument("--domain", help="Domain appended to bare client hostnames")
+
+	def handle(self, *args, **options):
+		vrf = None
+		if options["vrf"]:
+			try:
+				vrf = VRF.objects.get(name=options["vrf"])
+			except VRF.DoesNotExist:
+				raise CommandError(f"Unknown VRF '{options['vrf']}'")
+		for path in options["paths"]:
+			try:
+				created, updated = LeaseIngester(path, vrf=vrf, domain=options["domain"]).run()
+			except OSError as e:
+				raise CommandError(e)
+			self.stdout.write(f"{path}: {created} created, {updated} updated")
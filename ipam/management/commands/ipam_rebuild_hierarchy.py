@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ipam import hierarchy
+from ipam.models import VRF
+
+
+class Command(BaseCommand):
+	help = "Recompute the stored parent, depth and child counts of every prefix"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--vrf", action="append", help="Only rebuild the named VRF(s)")
+
+	def handle(self, *args, **options):
+		vrfs = VRF.objects.all()
+		if options["vrf"]:
+			vrfs = vrfs.filter(name__in=options["vrf"])
+		scopes = [(vrf.pk, vrf.name) for vrf in vrfs]
+		if not options["vrf"]:
+			scopes.insert(0, (None, "global"))
+		for vrf_id, name in scopes:
+			updated = hierarchy.rebuild(vrf_id)
+			self.stdout.write(f"{name}: {updated} prefixes updated")
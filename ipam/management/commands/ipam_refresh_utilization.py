@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from ipam import utilization
+
+
+class Command(BaseCommand):
+	help = "Recompute the materialized utilization of every prefix and aggregate"
+
+	def handle(self, *args, **options):
+		prefixes, aggregates = utilization.refresh()
+		self.stdout.write(f"{prefixes} prefixes and {aggregates} aggregates refreshed")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ipam import summarize
+from ipam.models import VRF
+
+
+class Command(BaseCommand):
+	help = "Report the minimal covering CIDRs, mergeable sibling prefixes and fragmentation of a VRF"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--vrf", help="VRF name (defaults to the global table)")
+		parser.add_argument("--status", help="Only consider prefixes with this status")
+		parser.add_argument("--verbose-blocks", action="store_true", help="List the covering CIDRs")
+
+	def handle(self, *args, **options):
+		vrf_id = None
+		if options["vrf"]:
+			try:
+				vrf_id = VRF.objects.get(name=options["vrf"]).pk
+			except VRF.DoesNotExist:
+				raise CommandError(f"Unknown VRF '{options['vrf']}'")
+		for summary in summarize.summarize(vrf_id, options["status"]):
+			self.stdout.write(f"IPv{summary['family']}: {summary['prefix_count']} prefixes, "
+			                  f"{summary['top_level_count']} top-level, {len(summary['covering'])} covering CIDRs, "
+			                  f"fragmentation {summary['fragmentation']}")
+			if options["verbose_blocks"]:
+				for block in summary["covering"]:
+					self.stdout.write(f"  {block}")
+			for first, second, supernet in summary["mergeable"]:
+				self.stdout.write(f"  merge {first} + {second} -> {supernet}")
@@ -0,0 +1,149 @@
+from collections import namedtuple
+
+from django.db import models
+from django.db.models import Q
+
+from ipam.utils import address_value, network_range
+
+
+class RangeQuerySet(models.QuerySet):
+
+	def sync_ranges(self, batch_size=1000):
+		"""
+		Recompute the stored numeric columns from the text value, e.g. for rows written before they existed.
+		"""
+		objs = []
+		count = 0
+		for obj in self.iterator(chunk_size=batch_size):
+			obj.update_range_fields()
+			objs.append(obj)
+			if len(objs) >= batch_size:
+				self.model.objects.bulk_update(objs, self.model.RANGE_FIELDS)
+				count += len(objs)
+				objs = []
+		if objs:
+			self.model.objects.bulk_update(objs, self.model.RANGE_FIELDS)
+			count += len(objs)
+		return count
+
+
+class NetworkQuerySet(RangeQuerySet):
+	"""
+	Containment lookups for models storing family, network_start and network_end columns.
+	"""
+
+	def containing(self, value):
+		"""
+		Return every network that contains the given address or prefix.
+		"""
+		family, _, first, last = network_range(value)
+		return self.filter(family=family, network_start__lte=first, network_end__gte=last)
+
+	def contained_by(self, value):
+		"""
+		Return every network that lies within the given prefix, including the prefix itself.
+		"""
+		family, _, first, last = network_range(value)
+		return self.filter(family=family, network_start__gte=first, network_end__lte=last)
+
+
+ServiceBinding = namedtuple("ServiceBinding", ["service", "device", "addresses"])
+NATHop = namedtuple("NATHop", ["pk", "address"])
+NATChain = namedtuple("NATChain", ["inside", "outside", "cycle"])
+
+
+class IPAddressQuerySet(RangeQuerySet):
+
+	def within(self, value):
+		"""
+		Return every address that falls inside the given prefix.
+		"""
+		family, _, first, last = network_range(value)
+		return self.filter(family=family, address_int__gte=first, address_int__lte=last)
+
+	def matching(self, value):
+		"""
+		Return every row holding the given address, whatever mask length it was stored with.
+		"""
+		family, number = address_value(value)
+		return self.filter(family=family, address_int=number)
+
+	def nat_chains(self, addresses):
+		"""
+		Resolve the NAT inside and outside chains of the given addresses (instances or pks).
+
+		Returns {pk: NATChain} where `inside` follows nat_inside hops, `outside` follows nat_outside hops and `cycle`
+		is True when the mapping loops back on itself. The edges are loaded outward from the given addresses, one
+		query per hop, and each query also reads the addresses of the hops it reaches.
+		"""
+		pks = [getattr(address, "pk", address) for address in addresses]
+		inside = {}
+		outside = {}
+		names = {}
+		seen = set()
+		frontier = set(pks)
+		while frontier:
+			seen.update(frontier)
+			rows = self.model.objects.filter(Q(pk__in=frontier) | Q(nat_inside__in=frontier)).values_list(
+				"pk", "nat_inside_id", "address")
+			reached = set()
+			for pk, target, address in rows:
+				names[pk] = address
+				if target is not None:
+					inside[pk] = target
+					outside[target] = pk
+					reached.update((pk, target))
+			frontier = reached - seen
+
+		def walk(pk, edges):
+			hops = []
+			seen = {pk}
+			while pk in edges:
+				pk = edges[pk]
+				if pk in seen:
+					return hops, True
+				seen.add(pk)
+				hops.append(pk)
+			return hops, False
+
+		walks = {}
+		for pk in pks:
+			inside_hops, inside_cycle = walk(pk, inside)
+			outside_hops, outside_cycle = walk(pk, outside)
+			walks[pk] = (inside_hops, outside_hops, inside_cycle or outside_cycle)
+
+		return {
+			pk: NATChain([NATHop(hop, names.get(hop)) for hop in inside_hops],
+			             [NATHop(hop, names.get(hop)) for hop in outside_hops], cycle)
+			for pk, (inside_hops, outside_hops, cycle) in walks.items()
+		}
+
+
+class ServiceQuerySet(models.QuerySet):
+
+	def listening(self, protocol=None, port=None, chunk_size=1000):
+		"""
+		Stream a ServiceBinding (service, device, addresses) for every matching service.
+
+		Services are read in primary key order, one chunk at a time with their device joined in, and the addresses
+		of a chunk come from a single query on the M2M table, so each chunk costs two queries.
+		"""
+		queryset = self
+		if protocol:
+			queryset = queryset.filter(protocol=protocol)
+		if port is not None:
+			queryset = queryset.filter(port=port)
+		through = self.model.addresses.through
+		last = 0
+		while True:
+			services = list(queryset.filter(pk__gt=last).select_related("device").order_by("pk")[:chunk_size])
+			if not services:
+				return
+			addresses = {service.pk: [] for service in services}
+			rows = through.objects.filter(service_id__in=addresses).order_by("ipaddress__address_int").values_list(
+				"service_id", "ipaddress__address")
+			for service_id, address in rows:
+				addresses[service_id].append(address)
+			for service in services:
+				yield ServiceBinding(service, service.device, addresses[service.pk])
+			last = services[-1].pk
@@ -1,13 +1,19 @@
 import netaddr
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 from inventory.models import Device
-from ipam.constants import VRF_RD_MAX_LENGTH
+from ipam import allocators
+from ipam.constants import IP_FAMILY_CHOICES, VLAN_VID_MAX, VLAN_VID_MIN, VRF_RD_MAX_LENGTH
 from ipam.enums import IPAddressStatusChoices, PrefixStatusChoices, ServiceProtocolChoices, VLANStatusChoices
+from ipam.fields import IPIntegerField
+from ipam.managers import IPAddressQuerySet, NetworkQuerySet, ServiceQuerySet
+from ipam.utils import address_value, network_range, parse_network
+from utilities.bits import bit_runs, first_run, lowest_bits
 
 
 # Create your models here.
@@ -43,14 +49,35 @@ class Aggregate(models.Model):
 	prefix = models.GenericIPAddressField(verbose_name=_("prefix"))
 	rir = models.ForeignKey(to=RIR, on_delete=models.PROTECT, related_name="aggregates")
 	description = models.CharField(max_length=200, blank=True, verbose_name=_("description"))
+	family = models.PositiveSmallIntegerField(choices=IP_FAMILY_CHOICES, editable=False, verbose_name=_("family"))
+	prefix_length = models.PositiveSmallIntegerField(editable=False, verbose_name=_("prefix length"))
+	network_start = IPIntegerField(editable=False, verbose_name=_("network start"))
+	network_end = IPIntegerField(editable=False, verbose_name=_("network end"))
+
+	objects = NetworkQuerySet.as_manager()
+
+	RANGE_FIELDS = ["prefix", "family", "prefix_length", "network_start", "network_end"]
 
 	class Meta:
 		verbose_name = _("aggregate")
 		verbose_name_plural = _("aggregates")
+		indexes = [
+			models.Index(fields=["family", "network_start", "network_end"]),
+		]
 
 	def __str__(self):
 		return self.prefix
 
+	def update_range_fields(self):
+		# Clear host bits from prefix
+		self.prefix = str(parse_network(self.prefix).cidr)
+		self.family, self.prefix_length, self.network_start, self.network_end = network_range(self.prefix)
+
+	def save(self, *args, **kwargs):
+		self.update_range_fields()
+
+		super().save(*args, **kwargs)
+
 
 class IPAddress(models.Model):
 	address = models.GenericIPAddressField(verbose_name=_("ip address"))
@@ -66,17 +93,74 @@ class IPAddress(models.Model):
 	                                  null=True, verbose_name=_("nat inside"))
 	dns_name = models.CharField(max_length=255, blank=True, verbose_name=_("dns name"))
 	description = models.CharField(max_length=200, blank=True, verbose_name=_("description"))
+	family = models.PositiveSmallIntegerField(choices=IP_FAMILY_CHOICES, editable=False, verbose_name=_("family"))
+	prefix_length = models.PositiveSmallIntegerField(editable=False, verbose_name=_("prefix length"))
+	address_int = IPIntegerField(editable=False, verbose_name=_("address integer"))
+	last_updated = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_("last updated"))
+
+	objects = IPAddressQuerySet.as_manager()
+
+	RANGE_FIELDS = ["family", "prefix_length", "address_int"]
 
 	class Meta:
 		verbose_name = _("ip address")
 		verbose_name_plural = _("ip addresses")
+		indexes = [
+			models.Index(fields=["family", "address_int"]),
+			models.Index(fields=["vrf", "family", "address_int"]),
+		]
 
 	def __str__(self):
 		return self.address
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Remember the published name and address so DNS zones they leave can be regenerated
+		instance._loaded_dns = instance.dns_scope
+		return instance
+
+	@property
+	def dns_scope(self):
+		fields = self.__dict__
+		if all(name in fields for name in ("dns_name", "family", "address_int")) and fields["dns_name"]:
+			return fields["dns_name"], fields["family"], fields["address_int"]
+		return None
+
+	def update_range_fields(self):
+		network = parse_network(self.address)
+		self.family, self.address_int = address_value(network)
+		# A bare address keeps the mask it was given before (e.g. by an import) rather than falling back to a host mask
+		if "/" in str(self.address) or self.prefix_length is None or self.prefix_length > network.prefixlen:
+			self.prefix_length = network.prefixlen
+
+	@property
+	def enforces_unique(self):
+		if self.vrf_id is None:
+			return getattr(settings, "ENFORCE_GLOBAL_UNIQUE", False)
+		return self.vrf.enforce_unique
+
+	def get_duplicates(self):
+		return IPAddress.objects.filter(vrf_id=self.vrf_id, family=self.family,
+		                                address_int=self.address_int).exclude(pk=self.pk)
+
+	def validate_unique_address(self):
+		if self.enforces_unique and self.get_duplicates().exists():
+			raise ValidationError({
+				"address": "Duplicate IP address found in {}: {}".format(
+					f"VRF {self.vrf}" if self.vrf_id else "global table", self.address)
+			})
+
+	def clean(self):
+		if self.address:
+			self.update_range_fields()
+			self.validate_unique_address()
+
 	def save(self, *args, **kwargs):
 		# Force dns_name to lowercase
 		self.dns_name = self.dns_name.lower()
+		self.update_range_fields()
+		self.validate_unique_address()
 
 		super().save(*args, **kwargs)
 
@@ -92,15 +176,59 @@ class VLANGroup(models.Model):
 	def __str__(self):
 		return self.name
 
+	def get_free_vid_bitmap(self):
+		"""
+		Return an integer whose set bits are the VLAN IDs (1-4094) still free in the group.
+		"""
+		used = 0
+		for vid in VLAN.objects.filter(group=self).values_list('vid', flat=True):
+			used |= 1 << vid
+		valid = ((1 << (VLAN_VID_MAX + 1)) - 1) ^ ((1 << VLAN_VID_MIN) - 1)
+		return valid & ~used
+
 	def get_next_available_vid(self):
 		"""
 		Return the first available VLAN ID (1-4094) in the group.
 		"""
-		vlan_ids = VLAN.objects.filter(group=self).values_list('vid', flat=True)
-		for i in range(1, 4095):
-			if i not in vlan_ids:
-				return i
-		return None
+		vids = lowest_bits(self.get_free_vid_bitmap(), 1)
+		return vids[0] if vids else None
+
+	def get_available_vids(self, count):
+		"""
+		Return up to `count` of the lowest available VLAN IDs in the group.
+		"""
+		return lowest_bits(self.get_free_vid_bitmap(), count)
+
+	def get_available_vid_range(self, count):
+		"""
+		Return the first VLAN ID of the lowest block of `count` consecutive free IDs, or None.
+		"""
+		return first_run(self.get_free_vid_bitmap(), count)
+
+	def get_free_vid_ranges(self):
+		"""
+		Return the free VLAN IDs of the group as a list of (first, last) ranges.
+		"""
+		return list(bit_runs(self.get_free_vid_bitmap()))
+
+	def allocate_vlans(self, count, contiguous=False, name="VLAN {vid}", **kwargs):
+		"""
+		Create `count` VLANs on free IDs of the group in a single locked transaction.
+
+		`name` is formatted with the allocated `vid`. With `contiguous` the IDs form one consecutive block.
+		"""
+		with transaction.atomic():
+			# Serialize concurrent allocations from the same group
+			VLANGroup.objects.select_for_update().get(pk=self.pk)
+			if contiguous:
+				first = self.get_available_vid_range(count)
+				vids = [] if first is None else list(range(first, first + count))
+			else:
+				vids = self.get_available_vids(count)
+			if len(vids) < count:
+				raise ValidationError(f"Not enough free VLAN IDs in {self.name} to allocate {count}")
+			objs = [VLAN(group=self, vid=vid, name=name.format(vid=vid), **kwargs) for vid in vids]
+			return VLAN.objects.bulk_create(objs)
 
 
 class VLAN(models.Model):
@@ -115,6 +243,7 @@ class VLAN(models.Model):
 	class Meta:
 		verbose_name = _("VLAN")
 		verbose_name_plural = _("VLANs")
+		unique_together = [["group", "vid"]]
 
 	def __str__(self):
 		return self.name
@@ -130,9 +259,14 @@ class Service(models.Model):
 	                                   verbose_name=_("ip addresses"))
 	description = models.CharField(max_length=200, blank=True, verbose_name=_("description"))
 
+	objects = ServiceQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = _("service")
 		verbose_name_plural = _("services")
+		indexes = [
+			models.Index(fields=["protocol", "port", "device"]),
+		]
 
 	def __str__(self):
 		return self.name
@@ -156,17 +290,176 @@ class Prefix(models.Model):
 	                          default=PrefixStatusChoices.STATUS_ACTIVE.value, verbose_name=_("status"))
 	is_pool = models.BooleanField(verbose_name=_("is pool"), default=False)
 	description = models.CharField(max_length=200, blank=True, verbose_name=_("description"))
+	family = models.PositiveSmallIntegerField(choices=IP_FAMILY_CHOICES, editable=False, verbose_name=_("family"))
+	prefix_length = models.PositiveSmallIntegerField(editable=False, verbose_name=_("prefix length"))
+	network_start = IPIntegerField(editable=False, verbose_name=_("network start"))
+	network_end = IPIntegerField(editable=False, verbose_name=_("network end"))
+	parent = models.ForeignKey(to="self", on_delete=models.SET_NULL, related_name="children", blank=True, null=True,
+	                           editable=False, verbose_name=_("parent"))
+	depth = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name=_("depth"))
+	child_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("children"))
+	descendant_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("descendants"))
+
+	objects = NetworkQuerySet.as_manager()
+
+	RANGE_FIELDS = ["prefix", "family", "prefix_length", "network_start", "network_end"]
 
 	class Meta:
 		verbose_name = _("prefix")
 		verbose_name_plural = _("prefixes")
+		indexes = [
+			models.Index(fields=["family", "network_start", "network_end"]),
+			models.Index(fields=["vrf", "family", "network_start", "network_end"]),
+		]
 
 	def __str__(self):
 		return self.prefix
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Remember where the prefix lived so a change can refresh the hierarchy it left
+		instance._loaded_scope = instance.hierarchy_scope
+		return instance
+
+	@property
+	def hierarchy_scope(self):
+		fields = self.__dict__
+		if all(name in fields for name in ("vrf_id", "family", "network_start", "network_end")):
+			return fields["vrf_id"], fields["family"], fields["network_start"], fields["network_end"]
+		return None
+
+	def update_range_fields(self):
+		# Clear host bits from prefix
+		self.prefix = str(parse_network(self.prefix).cidr)
+		self.family, self.prefix_length, self.network_start, self.network_end = network_range(self.prefix)
+
 	def save(self, *args, **kwargs):
-		if isinstance(self.prefix, netaddr.IPNetwork):
-			# Clear host bits from prefix
-			self.prefix = self.prefix.cidr
+		self.update_range_fields()
 
 		super().save(*args, **kwargs)
+
+	def get_usable_range(self):
+		"""
+		Return the first and last assignable address of the prefix as integers.
+		"""
+		if self.family == 4 and not self.is_pool and self.prefix_length < 31:
+			# Network and broadcast addresses are reserved unless the prefix is a pool
+			return self.network_start + 1, self.network_end - 1
+		return self.network_start, self.network_end
+
+	def get_next_available_ip(self, count=1):
+		"""
+		Return up to `count` free addresses of the prefix, lowest first.
+		"""
+		start, end = self.get_usable_range()
+		used = IPAddress.objects.filter(vrf_id=self.vrf_id).within(self.prefix).order_by("address_int").values_list(
+			"address_int", flat=True)
+		gaps = allocators.free_ranges(start, end, ((value, value) for value in used.iterator()))
+		return [str(netaddr.IPAddress(value, self.family)) for value in allocators.take(gaps, count)]
+
+	def get_next_available_prefix(self, length):
+		"""
+		Return the first free child prefix of the given length, or None if the prefix is exhausted.
+		"""
+		bits = 32 if self.family == 4 else 128
+		if not self.prefix_length < length <= bits:
+			raise ValidationError(f"Cannot allocate a /{length} from {self.prefix}")
+		used = Prefix.objects.filter(vrf_id=self.vrf_id).contained_by(self.prefix).exclude(pk=self.pk).order_by(
+			"network_start").values_list("network_start", "network_end")
+		gaps = allocators.free_ranges(self.network_start, self.network_end, used.iterator())
+		start = allocators.first_fit(gaps, 2 ** (bits - length))
+		if start is None:
+			return None
+		return str(netaddr.IPNetwork((start, length), self.family))
+
+	def allocate_ips(self, count=1, **kwargs):
+		"""
+		Create `count` IPAddress rows from the free space of the prefix in a single locked transaction.
+		"""
+		with transaction.atomic():
+			# Serialize concurrent allocations from the same prefix
+			Prefix.objects.select_for_update().get(pk=self.pk)
+			addresses = self.get_next_available_ip(count)
+			if len(addresses) < count:
+				raise ValidationError(f"Only {len(addresses)} addresses are available in {self.prefix}")
+			objs = []
+			for address in addresses:
+				obj = IPAddress(address=address, vrf_id=self.vrf_id, **kwargs)
+				obj.dns_name = obj.dns_name.lower()
+				obj.update_range_fields()
+				objs.append(obj)
+			return IPAddress.objects.bulk_create(objs, batch_size=1000)
+
+	def allocate_prefix(self, length, **kwargs):
+		"""
+		Create the first free child prefix of the given length in a single locked transaction.
+		"""
+		with transaction.atomic():
+			Prefix.objects.select_for_update().get(pk=self.pk)
+			prefix = self.get_next_available_prefix(length)
+			if prefix is None:
+				raise ValidationError(f"No /{length} is available in {self.prefix}")
+			kwargs.setdefault("vrf_id", self.vrf_id)
+			return Prefix.objects.create(prefix=prefix, **kwargs)
+
+
+class Utilization(models.Model):
+	size = IPIntegerField(verbose_name=_("size"))
+	child_span = IPIntegerField(verbose_name=_("child prefix span"))
+	utilization = models.FloatField(verbose_name=_("utilization"))
+	computed_at = models.DateTimeField(verbose_name=_("computed at"))
+
+	class Meta:
+		abstract = True
+
+	def __str__(self):
+		return f"{self.utilization}%"
+
+
+class PrefixUtilization(Utilization):
+	prefix = models.OneToOneField(to=Prefix, on_delete=models.CASCADE, related_name="utilization",
+	                              verbose_name=_("prefix"))
+	address_count = models.PositiveIntegerField(verbose_name=_("address count"))
+
+	class Meta:
+		verbose_name = _("prefix utilization")
+		verbose_name_plural = _("prefix utilization")
+
+
+class AggregateUtilization(Utilization):
+	aggregate = models.OneToOneField(to=Aggregate, on_delete=models.CASCADE, related_name="utilization",
+	                                 verbose_name=_("aggregate"))
+
+	class Meta:
+		verbose_name = _("aggregate utilization")
+		verbose_name_plural = _("aggregate utilization")
+
+
+class DNSZone(models.Model):
+	name = models.CharField(max_length=255, unique=True, verbose_name=_("name"))
+	serial = models.PositiveIntegerField(default=0, verbose_name=_("serial"))
+	record_count = models.PositiveIntegerField(default=0, verbose_name=_("records"))
+	generated_at = models.DateTimeField(blank=True, null=True, db_index=True, verbose_name=_("generated at"))
+	dirty = models.BooleanField(default=False, db_index=True, verbose_name=_("dirty"))
+
+	class Meta:
+		verbose_name = _("DNS zone")
+		verbose_name_plural = _("DNS zones")
+
+	def __str__(self):
+		return self.name
+
+
+class LeaseFile(models.Model):
+	path = models.CharField(max_length=255, unique=True, verbose_name=_("path"))
+	offset = models.BigIntegerField(default=0, verbose_name=_("offset"))
+	inode = models.BigIntegerField(blank=True, null=True, verbose_name=_("inode"))
+	updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
+
+	class Meta:
+		verbose_name = _("lease file")
+		verbose_name_plural = _("lease files")
+
+	def __str__(self):
+		return self.path
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ipam import dns, hierarchy
+from ipam.constants import PREFIX_CACHE_VERSION
+from ipam.lookup import prefix_lookup
+from ipam.models import Aggregate, IPAddress, Prefix
+from utilities.cache import bump_version
+
+
+def refresh_hierarchy(*scopes):
+	for scope in set(scope for scope in scopes if scope):
+		transaction.on_commit(lambda scope=scope: hierarchy.rebuild_scope(*scope))
+
+
+@receiver(post_save, sender=Prefix)
+def prefix_saved(sender, instance, raw=False, **kwargs):
+	if raw:
+		return
+	refresh_hierarchy(getattr(instance, "_loaded_scope", None), instance.hierarchy_scope)
+	instance._loaded_scope = instance.hierarchy_scope
+	transaction.on_commit(lambda: prefix_lookup.update(instance))
+
+
+@receiver(post_delete, sender=Prefix)
+def prefix_deleted(sender, instance, **kwargs):
+	refresh_hierarchy(instance.hierarchy_scope)
+	pk = instance.pk
+	transaction.on_commit(lambda: prefix_lookup.discard(pk))
+
+
+@receiver(post_save, sender=Aggregate)
+@receiver(post_delete, sender=Aggregate)
+@receiver(post_save, sender=Prefix)
+@receiver(post_delete, sender=Prefix)
+def prefixes_changed(sender, **kwargs):
+	transaction.on_commit(lambda: prefix_lookup.acknowledge(*bump_version(PREFIX_CACHE_VERSION)))
+
+
+@receiver(post_save, sender=IPAddress)
+def ip_address_saved(sender, instance, raw=False, **kwargs):
+	loaded = getattr(instance, "_loaded_dns", None)
+	if loaded and not raw and loaded != instance.dns_scope:
+		# The record moved or disappeared; the zones it was published in must be regenerated
+		dns.mark_dirty(dns.zones_for(*loaded))
+	instance._loaded_dns = instance.dns_scope
+
+
+@receiver(post_delete, sender=IPAddress)
+def ip_address_deleted(sender, instance, **kwargs):
+	if instance.dns_scope:
+		dns.mark_dirty(dns.zones_for(*instance.dns_scope))
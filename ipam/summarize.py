@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+import netaddr
+
+from ipam.allocators import merge_ranges, range_to_cidrs
+from ipam.constants import PREFIX_CACHE_VERSION
+from ipam.lookup import FAMILY_BITS
+from ipam.models import Prefix
+from utilities.cache import cached
+
+
+def summarize_ranges(family, rows):
+	"""
+	Summarize prefixes of one family given as (prefix, start, end, length) rows sorted by (start, length).
+
+	Returns the minimal covering CIDR set, the sibling pairs that could be merged into their supernet, and a
+	fragmentation score between 0 (already minimal) and 1.
+	"""
+	bits = FAMILY_BITS[family]
+	present = {}
+	top_level = []
+	reach = -1
+	for prefix, start, end, length in rows:
+		present.setdefault((start, length), prefix)
+		if start > reach:
+			top_level.append((start, end))
+			reach = end
+
+	covering = [
+		str(netaddr.IPNetwork((network, length), family))
+		for start, end in merge_ranges(top_level)
+		for network, length in range_to_cidrs(start, end, bits)
+	]
+
+	mergeable = []
+	for (start, length), prefix in present.items():
+		size = 1 << (bits - length)
+		if length == 0 or start % (size * 2):
+			continue
+		sibling = present.get((start + size, length))
+		if sibling and (start, length - 1) not in present:
+			mergeable.append((prefix, sibling, str(netaddr.IPNetwork((start, length - 1), family))))
+
+	fragmentation = 1 - len(covering) / len(top_level) if top_level else 0.0
+	return {
+		"family": family,
+		"prefix_count": len(present),
+		"top_level_count": len(top_level),
+		"covering": covering,
+		"mergeable": sorted(mergeable, key=lambda pair: netaddr.IPNetwork(pair[0])),
+		"fragmentation": round(fragmentation, 4),
+	}
+
+
+def summarize(vrf_id=None, status=None):
+	"""
+	Return a summary per address family of the prefixes of a VRF (None for the global table), optionally by status.
+	"""
+	queryset = Prefix.objects.filter(vrf_id=vrf_id)
+	if status:
+		queryset = queryset.filter(status=status)
+	rows = defaultdict(list)
+	for family, prefix, start, end, length in queryset.order_by("family", "network_start", "prefix_length").values_list(
+			"family", "prefix", "network_start", "network_end", "prefix_length").iterator(chunk_size=10000):
+		rows[family].append((prefix, start, end, length))
+	return [summarize_ranges(family, family_rows) for family, family_rows in sorted(rows.items())]
+
+
+def cached_summary(vrf_id=None, status=None):
+	return cached(PREFIX_CACHE_VERSION, f"summary:{vrf_id}:{status}", lambda: summarize(vrf_id, status))
@@ -1 +1,44 @@
-# Create your tests here.
+from django.test import TestCase
+
+from ipam import freespace, utilization
+from ipam.duplicates import find_duplicate_records
+from ipam.enums import PrefixStatusChoices
+from ipam.models import Aggregate, AggregateUtilization, IPAddress, Prefix, RIR, VRF
+
+
+class AggregateUtilizationTestCase(TestCase):
+
+	def test_aggregate_inside_container(self):
+		rir = RIR.objects.create(name="RFC 1918", is_private=True)
+		aggregate = Aggregate.objects.create(prefix="10.1.0.0/16", rir=rir)
+		Prefix.objects.create(prefix="10.0.0.0/8", status=PrefixStatusChoices.STATUS_CONTAINER.value)
+		Prefix.objects.create(prefix="10.1.2.0/24")
+		Prefix.objects.create(prefix="10.1.2.0/25")
+		Prefix.objects.create(prefix="10.2.0.0/24")
+
+		utilization.refresh()
+		row = AggregateUtilization.objects.get(aggregate=aggregate)
+		self.assertEqual((row.size, row.child_span, row.utilization), (65536, 256, 0.39))
+		self.assertEqual(row.child_span, freespace.aggregate_report(aggregate)["allocated"])
+
+
+class DuplicateRecordsTestCase(TestCase):
+
+	def test_unknown_vrf(self):
+		vrf = VRF.objects.create(name="Blue", enforce_unique=True)
+		IPAddress.objects.create(address="10.0.0.1", vrf=vrf)
+		IPAddress.objects.create(address="10.0.0.2")
+
+		records = [
+			(2, {"address": "10.0.0.1", "vrf": "Blue"}),
+			(3, {"address": "10.0.0.1", "vrf": str(vrf.pk)}),
+			(4, {"address": "10.0.0.2", "vrf": "Green"}),
+			(5, {"address": "10.0.0.3", "vrf": vrf.pk + 1}),
+		]
+		with self.settings(ENFORCE_GLOBAL_UNIQUE=True):
+			self.assertEqual(list(find_duplicate_records(records)), [
+				(3, "10.0.0.1 duplicates line 2"),
+				(4, "Unknown VRF 'Green'"),
+				(5, f"Unknown VRF '{vrf.pk + 1}'"),
+				(2, "10.0.0.1 already exists"),
+			])
@@ -0,0 +1,14 @@
+from django.urls import path
+
+from ipam import views
+
+app_name = "ipam"
+
+urlpatterns = [
+	path("prefixes/tree/", views.prefix_tree, name="prefix_tree"),
+	path("prefixes/utilization/", views.prefix_utilization, name="prefix_utilization"),
+	path("aggregates/utilization/", views.aggregate_utilization, name="aggregate_utilization"),
+	path("aggregates/<int:pk>/free/", views.aggregate_free_space, name="aggregate_free_space"),
+	path("rirs/<int:pk>/free/", views.rir_free_space, name="rir_free_space"),
+	path("services/", views.service_lookup, name="service_lookup"),
+]
@@ -0,0 +1,178 @@
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from ipam.enums import PrefixStatusChoices
+from ipam.models import Aggregate, AggregateUtilization, IPAddress, Prefix, PrefixUtilization
+
+
+def as_array(values, family):
+	"""
+	Return a NumPy array of address integers; IPv6 needs Python ints, so it falls back to an object array.
+	"""
+	return np.array(values, dtype=np.int64 if family == 4 else object)
+
+
+def count_within(sorted_values, starts, ends):
+	"""
+	Count, for every [start, end] range, the sorted values falling inside it.
+	"""
+	return np.searchsorted(sorted_values, ends, side="right") - np.searchsorted(sorted_values, starts, side="left")
+
+
+def top_level(starts, ends):
+	"""
+	Reduce ranges sorted by (start, -size) to the outermost ones, which are disjoint for CIDR prefixes.
+	"""
+	if not len(starts):
+		return starts, ends
+	reach = np.maximum.accumulate(ends)
+	keep = np.ones(len(starts), dtype=bool)
+	keep[1:] = starts[1:] > reach[:-1]
+	return starts[keep], ends[keep]
+
+
+def covered_span(prefix_starts, prefix_ends, starts, ends):
+	"""
+	Return the number of addresses of each [start, end] range covered by the prefixes it contains.
+
+	Prefixes are sorted by (start, -size). Prefixes enclosing a range, such as a container above an aggregate, are
+	not counted, matching the prefixes contained_by() reports as allocated.
+	"""
+	spans = []
+	for start, end in zip(starts, ends):
+		low = np.searchsorted(prefix_starts, start, side="left")
+		high = np.searchsorted(prefix_starts, end, side="right")
+		inside = prefix_ends[low:high] <= end
+		top_starts, top_ends = top_level(prefix_starts[low:high][inside], prefix_ends[low:high][inside])
+		spans.append(sum(top_ends - top_starts + 1))
+	return spans
+
+
+def load_addresses():
+	"""
+	Return {(vrf_id, family): sorted array of address integers}.
+	"""
+	values = defaultdict(list)
+	rows = IPAddress.objects.order_by("family", "address_int").values_list("vrf_id", "family", "address_int")
+	for vrf_id, family, address in rows.iterator(chunk_size=10000):
+		values[vrf_id, family].append(address)
+	return {key: as_array(addresses, key[1]) for key, addresses in values.items()}
+
+
+def load_prefixes():
+	"""
+	Return {(vrf_id, family): (pks, starts, ends, lengths, parents, is_container, is_pool)} sorted by (start, length).
+	"""
+	columns = defaultdict(lambda: ([], [], [], [], [], [], []))
+	rows = Prefix.objects.order_by("family", "network_start", "prefix_length", "pk").values_list(
+		"pk", "vrf_id", "family", "network_start", "network_end", "prefix_length", "parent_id", "status", "is_pool")
+	container = PrefixStatusChoices.STATUS_CONTAINER.value
+	for pk, vrf_id, family, start, end, length, parent_id, status, is_pool in rows.iterator(chunk_size=10000):
+		column = columns[vrf_id, family]
+		column[0].append(pk)
+		column[1].append(start)
+		column[2].append(end)
+		column[3].append(length)
+		column[4].append(parent_id or 0)
+		column[5].append(status == container)
+		column[6].append(is_pool)
+	return {
+		key: (np.array(pks, dtype=np.int64), as_array(starts, key[1]), as_array(ends, key[1]),
+		      np.array(lengths, dtype=np.int64), np.array(parents, dtype=np.int64), np.array(containers, dtype=bool),
+		      np.array(pools, dtype=bool))
+		for key, (pks, starts, ends, lengths, parents, containers, pools) in columns.items()
+	}
+
+
+def prefix_sizes(family, starts, ends, lengths, is_pool, containers):
+	sizes = ends - starts + 1
+	if family == 4:
+		# Network and broadcast addresses are not assignable outside pools and point-to-point prefixes; containers
+		# are measured by child span, which covers every address, so they keep their full size
+		sizes = np.where(~is_pool & ~containers & (lengths < 31), sizes - 2, sizes)
+	return sizes
+
+
+def child_span(pks, starts, ends, parents):
+	"""
+	Sum the sizes of the direct children of every prefix, counting duplicate children once.
+	"""
+	spans = np.zeros(len(pks), dtype=starts.dtype)
+	if not len(pks):
+		return spans
+	order = np.argsort(pks)
+	has_parent = parents > 0
+	positions = np.searchsorted(pks[order], parents[has_parent])
+	positions = np.minimum(positions, len(pks) - 1)
+	found = pks[order][positions] == parents[has_parent]
+	parent_index = order[positions[found]]
+	child_starts = starts[has_parent][found]
+	child_ends = ends[has_parent][found]
+	# Rows are sorted by start, so an exact duplicate always follows its twin
+	unique = np.ones(len(parent_index), dtype=bool)
+	unique[1:] = (child_starts[1:] != child_starts[:-1]) | (child_ends[1:] != child_ends[:-1]) | (
+		parent_index[1:] != parent_index[:-1])
+	np.add.at(spans, parent_index[unique], (child_ends - child_starts + 1)[unique])
+	return spans
+
+
+def percentage(used, size):
+	return [round(float(u) * 100 / float(s), 2) if s > 0 else 0.0 for u, s in zip(used, size)]
+
+
+def compute_prefixes():
+	addresses = load_addresses()
+	now = timezone.now()
+	objs = []
+	for (vrf_id, family), (pks, starts, ends, lengths, parents, containers, is_pool) in load_prefixes().items():
+		sizes = prefix_sizes(family, starts, ends, lengths, is_pool, containers)
+		values = addresses.get((vrf_id, family), as_array([], family))
+		counts = count_within(values, starts, ends)
+		spans = child_span(pks, starts, ends, parents)
+		used = np.where(containers, spans, counts)
+		for pk, size, count, span, percent in zip(pks, sizes, counts, spans, percentage(used, sizes)):
+			objs.append(PrefixUtilization(prefix_id=int(pk), size=int(size), address_count=int(count),
+			                              child_span=int(span), utilization=percent, computed_at=now))
+	return objs
+
+
+def compute_aggregates():
+	now = timezone.now()
+	objs = []
+	ranges = defaultdict(lambda: ([], []))
+	rows = Prefix.objects.order_by("family", "network_start", "prefix_length").values_list(
+		"family", "network_start", "network_end")
+	for family, start, end in rows.iterator(chunk_size=10000):
+		ranges[family][0].append(start)
+		ranges[family][1].append(end)
+	aggregates = defaultdict(lambda: ([], [], []))
+	for pk, family, start, end in Aggregate.objects.values_list("pk", "family", "network_start", "network_end"):
+		aggregates[family][0].append(pk)
+		aggregates[family][1].append(start)
+		aggregates[family][2].append(end)
+
+	for family, (pks, starts, ends) in aggregates.items():
+		starts, ends = as_array(starts, family), as_array(ends, family)
+		spans = covered_span(as_array(ranges[family][0], family), as_array(ranges[family][1], family), starts, ends)
+		sizes = ends - starts + 1
+		for pk, size, span, percent in zip(pks, sizes, spans, percentage(spans, sizes)):
+			objs.append(AggregateUtilization(aggregate_id=pk, size=int(size), child_span=int(span),
+			                                 utilization=percent, computed_at=now))
+	return objs
+
+
+def refresh(batch_size=5000):
+	"""
+	Recompute utilization of every prefix and aggregate and replace the materialized rows.
+	"""
+	prefixes = compute_prefixes()
+	aggregates = compute_aggregates()
+	with transaction.atomic():
+		PrefixUtilization.objects.all().delete()
+		PrefixUtilization.objects.bulk_create(prefixes, batch_size=batch_size)
+		AggregateUtilization.objects.all().delete()
+		AggregateUtilization.objects.bulk_create(aggregates, batch_size=batch_size)
+	return len(prefixes), len(aggregates)
@@ -0,0 +1,28 @@
+import netaddr
+
+
+def parse_network(value):
+	"""
+	Return a netaddr.IPNetwork for a CIDR string, a bare address or an existing netaddr object.
+	"""
+	if isinstance(value, netaddr.IPNetwork):
+		return value
+	if isinstance(value, netaddr.IPAddress):
+		return netaddr.IPNetwork(value)
+	return netaddr.IPNetwork(str(value).strip())
+
+
+def network_range(value):
+	"""
+	Return (family, prefix_length, first, last) for a prefix, with first and last as integers.
+	"""
+	network = parse_network(value)
+	return network.version, network.prefixlen, network.first, network.last
+
+
+def address_value(value):
+	"""
+	Return (family, integer) for an address, ignoring any mask length.
+	"""
+	network = parse_network(value)
+	return network.version, int(network.ip)
@@ -1 +1,139 @@
-# Create your views here.
+import json
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required, permission_required
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from ipam import freespace
+from ipam.models import Aggregate, AggregateUtilization, Prefix, PrefixUtilization, RIR, Service
+
+PAGE_SIZE_MAX = 1000
+
+
+class InvalidParameter(Exception):
+	pass
+
+
+def validated(view):
+	"""
+	Answer 400 Bad Request when a view rejects one of its query parameters.
+	"""
+	@wraps(view)
+	def wrapper(request, *args, **kwargs):
+		try:
+			return view(request, *args, **kwargs)
+		except InvalidParameter as e:
+			return HttpResponseBadRequest(str(e))
+	return wrapper
+
+
+def query_int(request, name, default=None):
+	value = request.GET.get(name)
+	if value in (None, ""):
+		return default
+	try:
+		return int(value)
+	except ValueError:
+		raise InvalidParameter(f"'{name}' must be an integer") from None
+
+
+def page_bounds(request):
+	offset = max(query_int(request, "offset", 0), 0)
+	limit = min(max(query_int(request, "limit", 100), 1), PAGE_SIZE_MAX)
+	return offset, limit
+
+
+@require_GET
+@login_required
+@permission_required("ipam.view_prefix", raise_exception=True)
+@validated
+def prefix_tree(request):
+	"""
+	Return prefixes in tree order with their stored hierarchy columns, one page at a time.
+	"""
+	offset, limit = page_bounds(request)
+	queryset = Prefix.objects.filter(vrf_id=query_int(request, "vrf"))
+	rows = queryset.order_by("family", "network_start", "prefix_length", "pk").values(
+		"id", "prefix", "status", "is_pool", "parent_id", "depth", "child_count", "descendant_count"
+	)[offset:offset + limit]
+	return JsonResponse({"offset": offset, "limit": limit, "results": list(rows)})
+
+
+@require_GET
+@login_required
+@permission_required("ipam.view_prefix", raise_exception=True)
+@validated
+def prefix_utilization(request):
+	"""
+	Return the materialized utilization of prefixes, one page at a time.
+	"""
+	offset, limit = page_bounds(request)
+	rows = PrefixUtilization.objects.order_by("prefix_id").values_list(
+		"prefix_id", "prefix__prefix", "prefix__vrf_id", "size", "address_count", "child_span", "utilization",
+		"computed_at")[offset:offset + limit]
+	keys = ["id", "prefix", "vrf_id", "size", "address_count", "child_span", "utilization", "computed_at"]
+	return JsonResponse({"offset": offset, "limit": limit, "results": [dict(zip(keys, row)) for row in rows]})
+
+
+@require_GET
+@login_required
+@permission_required("ipam.view_aggregate", raise_exception=True)
+@validated
+def aggregate_utilization(request):
+	"""
+	Return the materialized utilization of aggregates, one page at a time.
+	"""
+	offset, limit = page_bounds(request)
+	rows = AggregateUtilization.objects.order_by("aggregate_id").values_list(
+		"aggregate_id", "aggregate__prefix", "aggregate__rir__name", "size", "child_span", "utilization",
+		"computed_at")[offset:offset + limit]
+	keys = ["id", "prefix", "rir", "size", "child_span", "utilization", "computed_at"]
+	return JsonResponse({"offset": offset, "limit": limit, "results": [dict(zip(keys, row)) for row in rows]})
+
+
+@require_GET
+@login_required
+@permission_required("ipam.view_aggregate", raise_exception=True)
+def aggregate_free_space(request, pk):
+	"""
+	Return the allocated and free space of an aggregate with its free CIDR blocks.
+	"""
+	aggregate = get_object_or_404(Aggregate, pk=pk)
+	return JsonResponse(freespace.aggregate_report(aggregate))
+
+
+@require_GET
+@login_required
+@permission_required(("ipam.view_rir", "ipam.view_aggregate"), raise_exception=True)
+def rir_free_space(request, pk):
+	"""
+	Return the free space report of every aggregate of a RIR.
+	"""
+	rir = get_object_or_404(RIR, pk=pk)
+	return JsonResponse({"id": rir.pk, "name": rir.name, "aggregates": freespace.rir_report(rir)})
+
+
+@require_GET
+@login_required
+@permission_required(("ipam.view_service", "ipam.view_ipaddress", "inventory.view_device"), raise_exception=True)
+@validated
+def service_lookup(request):
+	"""
+	Stream every service matching ?protocol= and ?port= as JSON lines, with its device and addresses.
+	"""
+	bindings = Service.objects.listening(protocol=request.GET.get("protocol"), port=query_int(request, "port"))
+
+	def lines():
+		for binding in bindings:
+			yield json.dumps({
+				"id": binding.service.pk,
+				"name": binding.service.name,
+				"protocol": binding.service.protocol,
+				"port": binding.service.port,
+				"device": {"id": binding.device.pk, "name": binding.device.name} if binding.device else None,
+				"addresses": binding.addresses,
+			}) + "\n"
+
+	return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
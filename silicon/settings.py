@@ -46,7 +46,8 @@ INSTALLED_APPS = [
 	'datacenter',
 	'tenant',
 	'inventory',
-	'ipam'
+	'ipam',
+	'utilities'
 ]
 
 MIDDLEWARE = [
@@ -92,6 +93,19 @@ DATABASES = {
 	}
 }
 
+# Cache
+# Shared by every worker and management command, so cache versions bumped by one process are seen by all;
+# create the table with `manage.py createcachetable`
+CACHES = {
+	'default': {
+		'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+		'LOCATION': 'silicon_cache',
+		'OPTIONS': {
+			'MAX_ENTRIES': 10000,
+		},
+	}
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -128,6 +142,27 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Uploaded files
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = '/media/'
+
+# Thumbnail Settings
+# Image fields served as thumbnails, by model label
+THUMBNAIL_FIELDS = {
+	'inventory.devicetype': ['front_image', 'rear_image'],
+	'account.account': ['avatar'],
+	'team.team': ['avatar'],
+}
+# Named bounding boxes thumbnails are fitted in, aspect ratio preserved
+THUMBNAIL_SIZES = {
+	'small': (64, 64),
+	'medium': (256, 256),
+	'large': (800, 800),
+}
+# Derivatives are stored under MEDIA_ROOT in this directory
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_MAX_AGE = 86400
+
 # Account Settings
 SITE_ID = 1
 ACCOUNT_EMAIL_CONFIRMATION_EXPIRE_DAYS = 1
@@ -135,3 +170,37 @@ ACCOUNT_EMAIL_CONFIRMATION_EXPIRE_DAYS = 1
 # Invitations Settings
 INVITATIONS_DEFAULT_EXPIRATION = 168
 INVITATIONS_DEFAULT_INVITE_ALLOCATION = 0
+
+# IPAM Settings
+# Reject duplicate addresses in the global table (VRF-less addresses), like VRF.enforce_unique does for a VRF
+ENFORCE_GLOBAL_UNIQUE = False
+
+# DNS Settings
+DNS_ZONE_DIR = BASE_DIR / 'zones'
+DNS_ZONE_TTL = 3600
+DNS_ZONE_NAMESERVER = 'localhost.'
+DNS_ZONE_HOSTMASTER = 'hostmaster.localhost.'
+# Forward zones to generate; when empty each name is placed in its parent domain
+DNS_FORWARD_ZONES = []
+# Reverse zone boundaries, on octet (IPv4) and nibble (IPv6) boundaries
+DNS_REVERSE_IPV4_PREFIX_LENGTH = 24
+DNS_REVERSE_IPV6_PREFIX_LENGTH = 64
+
+# Inventory Settings
+# Cable terminations that end a path; any other object with exactly two cables is traced through (e.g. patch panels)
+CABLE_ENDPOINT_MODELS = ['inventory.device']
+# Height in units of the elevation devices are positioned in
+RACK_U_HEIGHT = 42
+# Reject devices overlapping another positioned device. Devices are not assigned to racks yet, so every positioned
+# device counts as part of a single elevation; enable only when all of them are in one rack
+RACK_OCCUPANCY_VALIDATION = False
+
+# Datacenter Settings
+# Requests in flight per provider host during a sync
+DATACENTER_SYNC_HOST_CONCURRENCY = 4
+# Seconds before a provider request is abandoned
+DATACENTER_SYNC_TIMEOUT = 30
+# Seconds a pooled provider session may sit unused before it is closed
+DATACENTER_SESSION_IDLE_TIMEOUT = 600
+# Seconds before a provider token is renewed even if the provider still accepts it
+DATACENTER_SESSION_TOKEN_TTL = 1500
@@ -19,5 +19,8 @@ from django.urls import include, path
 
 urlpatterns = [
 	path('admin/', admin.site.urls),
+	path('inventory/', include('inventory.urls')),
+	path('ipam/', include('ipam.urls')),
+	path('', include('utilities.urls')),
 	url('', include('django_prometheus.urls')),
 ]
@@ -0,0 +1,37 @@
+def lowest_bits(mask, count):
+	"""
+	Return the positions of the `count` lowest set bits of an integer bitmap.
+	"""
+	positions = []
+	while mask and len(positions) < count:
+		bit = mask & -mask
+		positions.append(bit.bit_length() - 1)
+		mask ^= bit
+	return positions
+
+
+def first_run(mask, length):
+	"""
+	Return the position of the lowest run of `length` consecutive set bits, or None.
+	"""
+	run = 1
+	while run < length and mask:
+		# Each step doubles the run length every surviving bit is known to start
+		shift = min(run, length - run)
+		mask &= mask >> shift
+		run += shift
+	if not mask:
+		return None
+	return (mask & -mask).bit_length() - 1
+
+
+def bit_runs(mask):
+	"""
+	Yield (first, last) positions of every run of consecutive set bits, lowest first.
+	"""
+	while mask:
+		low = (mask & -mask).bit_length() - 1
+		tail = mask >> low
+		length = ((tail + 1) & ~tail).bit_length() - 1
+		yield low, low + length - 1
+		mask &= ~(((1 << length) - 1) << low)
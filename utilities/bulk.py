@@ -0,0 +1,61 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+
+RowError = namedtuple("RowError", ["line", "message"])
+
+
+def chunked(iterable, size):
+	"""
+	Yield lists of at most `size` items from an iterable without materializing it.
+	"""
+	iterator = iter(iterable)
+	while True:
+		chunk = list(islice(iterator, size))
+		if not chunk:
+			return
+		yield chunk
+
+
+def detect_format(path):
+	extension = os.path.splitext(str(path))[1].lower()
+	return "jsonl" if extension in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def read_records(source, format=None):
+	"""
+	Stream (line_number, record) pairs from a CSV or JSON Lines file path or text stream.
+
+	Malformed JSON lines are yielded as (line_number, ValueError) so callers can report them and carry on.
+	"""
+	if isinstance(source, (str, os.PathLike)):
+		format = format or detect_format(source)
+		with open(source, newline="", encoding="utf-8") as stream:
+			yield from read_records(stream, format)
+		return
+
+	if format == "jsonl":
+		for number, line in enumerate(source, start=1):
+			if not line.strip():
+				continue
+			try:
+				yield number, json.loads(line)
+			except ValueError as e:
+				yield number, e
+	else:
+		reader = csv.DictReader(source)
+		for record in reader:
+			yield reader.line_num, record
+
+
+def clean_status(value, choices):
+	value = (value or "").strip().lower()
+	if not value:
+		return None
+	if value not in [choice.value for choice in choices]:
+		raise ValidationError(f"Invalid status '{value}'")
+	return value
@@ -0,0 +1,44 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_TIMEOUT = None
+
+
+def get_version(name):
+	"""
+	Return the current change counter for `name`, used to key cached results derived from a table.
+	"""
+	version = cache.get(f"version:{name}")
+	if version is None:
+		# Seed from the clock rather than 1, so a counter evicted from the cache never repeats an old value
+		cache.add(f"version:{name}", time.time_ns(), VERSION_TIMEOUT)
+		version = cache.get(f"version:{name}")
+	return version
+
+
+def bump_version(*names):
+	"""
+	Invalidate every cached result keyed on the given counters, returning their new values.
+	"""
+	versions = []
+	for name in names:
+		key = f"version:{name}"
+		try:
+			versions.append(cache.incr(key))
+		except ValueError:
+			versions.append(time.time_ns())
+			cache.set(key, versions[-1], VERSION_TIMEOUT)
+	return versions
+
+
+def cached(name, key, compute, timeout=None):
+	"""
+	Return compute() cached under `key` until the `name` counter changes.
+	"""
+	full_key = f"{name}:{get_version(name)}:{key}"
+	value = cache.get(full_key)
+	if value is None:
+		value = compute()
+		cache.set(full_key, value, timeout)
+	return value
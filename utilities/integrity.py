@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from utilities.models import ScanCheckpoint
+
+Dangling = namedtuple("Dangling", ["relation", "pk", "content_type_id", "object_id"])
+
+
+class GenericRelation:
+	"""
+	A GenericForeignKey of a model, scanned by primary key in chunks.
+	"""
+
+	def __init__(self, model, field):
+		self.model = model
+		self.field = field
+		self.ct_field = model._meta.get_field(field.ct_field).attname
+		self.fk_field = field.fk_field
+		self.name = f"{model._meta.label_lower}.{field.name}"
+
+	def __str__(self):
+		return self.name
+
+	@property
+	def nullable(self):
+		"""
+		Whether dangling references can be cleared rather than their rows deleted.
+		"""
+		return all(self.model._meta.get_field(name).null for name in (self.field.ct_field, self.fk_field))
+
+	def chunk(self, after, size):
+		"""
+		Return (pk, content type id, object id) of the next `size` rows with a reference, after pk `after`.
+		"""
+		rows = self.model._base_manager.filter(pk__gt=after, **{f"{self.ct_field}__isnull": False,
+		                                                        f"{self.fk_field}__isnull": False})
+		return list(rows.order_by("pk").values_list("pk", self.ct_field, self.fk_field)[:size])
+
+	def dangling(self, rows):
+		"""
+		Return the rows whose target is missing, with one IN query per content type.
+		"""
+		by_type = {}
+		for row in rows:
+			by_type.setdefault(row[1], []).append(row)
+		missing = []
+		for content_type_id, typed in by_type.items():
+			target = ContentType.objects.get_for_id(content_type_id).model_class()
+			found = set()
+			if target is not None:
+				ids = set(object_id for _, _, object_id in typed)
+				found = set(target._base_manager.filter(pk__in=ids).values_list("pk", flat=True))
+			missing.extend(Dangling(self.name, *row) for row in typed if row[2] not in found)
+		return missing
+
+	def repair(self, dangling):
+		"""
+		Clear nullable references, or delete the rows holding them. Returns the number of rows changed.
+		"""
+		rows = self.model._base_manager.filter(pk__in=[row.pk for row in dangling])
+		if self.nullable:
+			return rows.update(**{self.ct_field: None, self.fk_field: None})
+		# Deleting instances, rather than a raw DELETE, keeps signal receivers such as cable tracing informed
+		return rows.delete()[1].get(self.model._meta.label, 0)
+
+
+def generic_relations():
+	"""
+	Return every GenericForeignKey of every installed model.
+	"""
+	return [GenericRelation(model, field) for model in apps.get_models() for field in model._meta.private_fields if
+	        isinstance(field, GenericForeignKey)]
+
+
+def scan(relation, chunk_size=1000, repair=False, resume=True):
+	"""
+	Yield the dangling references of a relation, optionally repairing them chunk by chunk.
+
+	Progress is checkpointed after every chunk so an interrupted scan resumes where it stopped; the checkpoint
+	is removed once the table has been fully scanned.
+	"""
+	checkpoint, _ = ScanCheckpoint.objects.get_or_create(name=f"integrity:{relation.name}")
+	position = checkpoint.position if resume else 0
+	while True:
+		rows = relation.chunk(position, chunk_size)
+		if not rows:
+			break
+		dangling = relation.dangling(rows)
+		with transaction.atomic():
+			if repair and dangling:
+				relation.repair(dangling)
+			position = rows[-1][0]
+			ScanCheckpoint.objects.filter(pk=checkpoint.pk).update(position=position)
+		yield from dangling
+	checkpoint.delete()
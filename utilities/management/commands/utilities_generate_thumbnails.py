@@ -0,0 +1,34 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utilities import thumbnails
+from utilities.bulk import chunked
+
+
+class Command(BaseCommand):
+	help = "Render every missing image thumbnail ahead of time, using a pool of worker processes"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--size", action="append", choices=sorted(settings.THUMBNAIL_SIZES), dest="sizes",
+		                    help="Only render this size; may be repeated")
+		parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+
+	def handle(self, *args, **options):
+		rendered = 0
+		failed = 0
+		with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+			# Submit in chunks so the queue of pending work stays bounded
+			for chunk in chunked(thumbnails.pending(options["sizes"]), options["workers"] * 16):
+				futures = [(source, pool.submit(thumbnails.render, source, target, dimensions))
+				           for source, target, dimensions in chunk]
+				for source, future in futures:
+					try:
+						future.result()
+						rendered += 1
+					except OSError as e:
+						failed += 1
+						self.stderr.write(f"{source}: {e}")
+		self.stdout.write(f"{rendered} thumbnails rendered, {failed} failed")
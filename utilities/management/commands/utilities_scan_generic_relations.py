@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities import integrity
+
+
+class Command(BaseCommand):
+	help = "Find generic foreign keys pointing at deleted objects, optionally clearing them or deleting their rows"
+
+	def add_arguments(self, parser):
+		parser.add_argument("relations", nargs="*", help="Relations to scan, e.g. ipam.ipaddress.assigned_object; "
+		                                                 "all of them when omitted")
+		parser.add_argument("--repair", action="store_true",
+		                    help="Clear nullable references and delete rows with required ones")
+		parser.add_argument("--chunk-size", type=int, default=1000, help="Rows checked per query")
+		parser.add_argument("--restart", action="store_true", help="Ignore saved progress and scan from the start")
+
+	def handle(self, *args, **options):
+		relations = {relation.name: relation for relation in integrity.generic_relations()}
+		unknown = set(options["relations"]) - set(relations)
+		if unknown:
+			raise CommandError(f"Unknown relations: {', '.join(sorted(unknown))}; choose from "
+			                   f"{', '.join(sorted(relations))}")
+		for name in options["relations"] or sorted(relations):
+			relation = relations[name]
+			count = 0
+			for row in integrity.scan(relation, options["chunk_size"], options["repair"], not options["restart"]):
+				self.stdout.write(f"{relation} {row.pk}: content type {row.content_type_id} id {row.object_id}")
+				count += 1
+			action = "repaired" if options["repair"] else "found"
+			self.stdout.write(f"{relation}: {count} dangling references {action}")
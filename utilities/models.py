@@ -0,0 +1,15 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class ScanCheckpoint(models.Model):
+	name = models.CharField(max_length=255, unique=True, verbose_name=_("name"))
+	position = models.BigIntegerField(default=0, verbose_name=_("position"))
+	updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
+
+	class Meta:
+		verbose_name = _("scan checkpoint")
+		verbose_name_plural = _("scan checkpoints")
+
+	def __str__(self):
+		return self.name
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_save
+
+from utilities import thumbnails
+
+# Image field names watched per model, filled in by connect()
+image_fields = {}
+
+
+def source_replaced(sender, instance, raw=False, **kwargs):
+	if raw or instance.pk is None:
+		return
+	fields = image_fields[sender]
+	previous = sender._default_manager.filter(pk=instance.pk).values_list(*fields).first()
+	if previous is None:
+		return
+	for name, old in zip(fields, previous):
+		if old and old != getattr(instance, name).name:
+			transaction.on_commit(lambda old=old: thumbnails.purge(old))
+
+
+def source_deleted(sender, instance, **kwargs):
+	for name in image_fields[sender]:
+		old = getattr(instance, name).name
+		if old:
+			transaction.on_commit(lambda old=old: thumbnails.purge(old))
+
+
+def connect():
+	"""
+	Purge the derivatives of images that are replaced or whose object is deleted.
+	"""
+	for model, name in thumbnails.image_fields():
+		image_fields.setdefault(model, []).append(name)
+	for model in image_fields:
+		pre_save.connect(source_replaced, sender=model, dispatch_uid=f"thumbnails.replaced.{model._meta.label}")
+		post_delete.connect(source_deleted, sender=model, dispatch_uid=f"thumbnails.deleted.{model._meta.label}")
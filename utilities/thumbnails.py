@@ -0,0 +1,126 @@
+import glob
+import hashlib
+import os
+import tempfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image, ImageOps
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def thumbnail_root():
+	return os.path.join(settings.MEDIA_ROOT, settings.THUMBNAIL_DIR)
+
+
+def image_fields():
+	"""
+	Yield (model, field name) for every image field thumbnails are served for.
+	"""
+	for label, fields in settings.THUMBNAIL_FIELDS.items():
+		model = apps.get_model(label)
+		for name in fields:
+			yield model, name
+
+
+def content_hash(path):
+	"""
+	Return the SHA-1 of a file, remembered in the cache for as long as its size and mtime are unchanged.
+	"""
+	stat = os.stat(path)
+	key = f"thumbnail:{path}:{stat.st_size}:{stat.st_mtime_ns}"
+	digest = cache.get(key)
+	if digest is None:
+		sha = hashlib.sha1()
+		with open(path, "rb") as source:
+			for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+				sha.update(chunk)
+		digest = sha.hexdigest()
+		cache.set(key, digest, None)
+	return digest
+
+
+def thumbnail_path(digest, size):
+	"""
+	Return the derivative path of a source hash, without its extension.
+	"""
+	width, height = settings.THUMBNAIL_SIZES[size]
+	return os.path.join(thumbnail_root(), digest[:2], f"{digest}-{width}x{height}")
+
+
+def render(source, target, dimensions):
+	"""
+	Write a thumbnail of `source` fitting within `dimensions` next to `target`, returning the file written.
+
+	Self-contained so it can run in a worker process; the file is renamed into place so readers never see a
+	partial image.
+	"""
+	with Image.open(source) as image:
+		image = ImageOps.exif_transpose(image)
+		image.thumbnail(dimensions, Image.LANCZOS)
+		if image.mode in ("RGBA", "LA", "P"):
+			path, format, options = f"{target}.png", "PNG", {"optimize": True}
+		else:
+			path, format, options = f"{target}.jpg", "JPEG", {"quality": 85, "optimize": True}
+			image = image.convert("RGB")
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+		try:
+			with os.fdopen(descriptor, "wb") as output:
+				image.save(output, format, **options)
+			os.replace(temporary, path)
+		except Exception:
+			os.remove(temporary)
+			raise
+	return path
+
+
+def existing(target):
+	for extension in (".png", ".jpg"):
+		if os.path.exists(target + extension):
+			return target + extension
+	return None
+
+
+def get_thumbnail(field_file, size):
+	"""
+	Return the path of a sized derivative of an image field file, rendering it on first request.
+	"""
+	target = thumbnail_path(content_hash(field_file.path), size)
+	return existing(target) or render(field_file.path, target, settings.THUMBNAIL_SIZES[size])
+
+
+def pending(sizes=None):
+	"""
+	Yield (source, target, dimensions) for every derivative not rendered yet.
+	"""
+	sizes = sizes or list(settings.THUMBNAIL_SIZES)
+	seen = set()
+	for model, name in image_fields():
+		for value in model._default_manager.exclude(**{name: ""}).exclude(**{f"{name}__isnull": True}).values_list(
+				name, flat=True).iterator():
+			source = os.path.join(settings.MEDIA_ROOT, value)
+			if not os.path.exists(source):
+				continue
+			digest = content_hash(source)
+			for size in sizes:
+				target = thumbnail_path(digest, size)
+				if target not in seen and not existing(target):
+					seen.add(target)
+					yield source, target, settings.THUMBNAIL_SIZES[size]
+
+
+def purge(name):
+	"""
+	Delete every derivative of a source file, given its storage name.
+	"""
+	source = os.path.join(settings.MEDIA_ROOT, name)
+	if not name or not os.path.exists(source):
+		return 0
+	digest = content_hash(source)
+	paths = glob.glob(os.path.join(thumbnail_root(), digest[:2], f"{digest}-*"))
+	for path in paths:
+		os.remove(path)
+	return len(paths)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from utilities import views
+
+app_name = "utilities"
+
+urlpatterns = [
+	path("thumbnails/<str:app_label>/<str:model_name>/<int:pk>/<str:field>/<str:size>/", views.thumbnail,
+	     name="thumbnail"),
+]
@@ -0,0 +1,31 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from utilities import thumbnails
+
+
+@require_GET
+@login_required
+def thumbnail(request, app_label, model_name, pk, field, size):
+	"""
+	Serve a sized derivative of an image field, rendering it on first request.
+	"""
+	if field not in settings.THUMBNAIL_FIELDS.get(f"{app_label}.{model_name}", []) or \
+			size not in settings.THUMBNAIL_SIZES:
+		raise Http404
+	model = next(model for model, name in thumbnails.image_fields() if
+	             model._meta.label_lower == f"{app_label}.{model_name}" and name == field)
+	field_file = getattr(get_object_or_404(model, pk=pk), field)
+	if not field_file or not os.path.exists(field_file.path):
+		raise Http404
+	path = thumbnails.get_thumbnail(field_file, size)
+	response = FileResponse(open(path, "rb"))
+	# The file name embeds the source hash, so it doubles as a validator
+	response["ETag"] = f'"{os.path.basename(path)}"'
+	response["Cache-Control"] = f"max-age={settings.THUMBNAIL_MAX_AGE}"
+	return response